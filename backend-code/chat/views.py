@@ -36,7 +36,11 @@ from langchain_core.messages import HumanMessage, AIMessage
 
 # 올바른 앱에서 import
 from searchHospital.models import Hospital
+from searchHospital.schedule import hospital_state, schedule_for, to_hhmm
+from searchHospital.spatial_index import nearest_matching_hospitals, ranked_hospitals_within
 from searchPharmacy.models import Pharmacy
+from icare.holidays import effective_slot, effective_weekday
+from icare.week_slots import is_set
 
 # 로그 설정
 logger = logging.getLogger(__name__)
@@ -100,67 +104,11 @@ def transcribe_speech(audio_file_path):
                 
                 
 # 시간 관련 유틸리티 함수들
-def normalize_time(time_str):
-    """시간 문자열을 정규화"""
-    try:
-        time_str = re.sub(r'[가-힣]', '', time_str)
-        time_str = time_str.strip()
-        
-        if time_str.startswith('24:'):
-            return '00:00'
-        elif time_str.startswith('30:'):
-            return '18:00'
-            
-        return time_str
-    except Exception:
-        return '00:00'
-
 def get_hospital_state(hospital, target_time=None):
-    """병원의 영업 상태를 확인"""
+    """병원의 영업 상태를 확인 (주간 영업 슬롯 비트맵 기준)"""
     if target_time is None:
         target_time = datetime.now()
-        
-    weekday = target_time.weekday()
-    target_time_str = target_time.strftime('%H%M')
-    target_time_int = int(target_time_str)
-    
-    # 요일별 시간 처리
-    if weekday == 6:  # 일요일
-        if hospital.sunday_closed:
-            return "영업종료"
-        hours = hospital.sunday_hours
-        lunch_key = 'sunday'
-    elif weekday == 5:  # 토요일
-        hours = hospital.saturday_hours
-        lunch_key = 'saturday'
-    else:  # 평일
-        day_key = ['mon', 'tue', 'wed', 'thu', 'fri'][weekday]
-        hours = hospital.weekday_hours.get(day_key) if hospital.weekday_hours else None
-        lunch_key = 'weekday'
-    
-    if not hours:
-        return "영업종료"
-        
-    try:
-        start_time = int(datetime.strptime(normalize_time(hours['start']), '%H:%M').strftime('%H%M'))
-        end_time = int(datetime.strptime(normalize_time(hours['end']), '%H:%M').strftime('%H%M'))
-        
-        if start_time <= target_time_int <= end_time:
-            # 점심시간 체크
-            if hospital.lunch_time and lunch_key in hospital.lunch_time:
-                lunch = hospital.lunch_time[lunch_key]
-                if lunch:
-                    lunch_start = int(datetime.strptime(normalize_time(lunch['start']), '%H:%M').strftime('%H%M'))
-                    lunch_end = int(datetime.strptime(normalize_time(lunch['end']), '%H:%M').strftime('%H%M'))
-                    
-                    if lunch_start <= target_time_int <= lunch_end:
-                        return "점심시간"
-            return "영업중"
-            
-        return "영업종료"
-        
-    except ValueError:
-        return "영업종료"
+    return hospital_state(hospital, target_time)
 
 def parse_target_time(time_str: str) -> datetime:
     """
@@ -217,48 +165,14 @@ def parse_target_time(time_str: str) -> datetime:
         return current_time
 
 def get_hospital_opening_time(hospital, target_date):
-    """병원의 영업 시작 시간을 가져옴"""
-    weekday = target_date.weekday()
-    
-    try:
-        if weekday == 6:  # 일요일
-            if hospital.sunday_closed:
-                return None
-            hours = hospital.sunday_hours
-        elif weekday == 5:  # 토요일
-            hours = hospital.saturday_hours
-        else:  # 평일
-            day_key = ['mon', 'tue', 'wed', 'thu', 'fri'][weekday]
-            hours = hospital.weekday_hours.get(day_key) if hospital.weekday_hours else None
-            
-        if not hours:
-            return None
-            
-        return int(datetime.strptime(normalize_time(hours['start']), '%H:%M').strftime('%H%M'))
-    except:
-        return None
+    """병원의 영업 시작 시간을 가져옴 (HHMM 정수, 해당 요일 진료 일정이 없으면 None)"""
+    schedule = schedule_for(hospital, effective_weekday(target_date))
+    return to_hhmm(schedule.open_min) if schedule else None
 
 def get_hospital_closing_time(hospital, target_date):
-    """병원의 영업 종료 시간을 가져옴"""
-    weekday = target_date.weekday()
-    
-    try:
-        if weekday == 6:  # 일요일
-            if hospital.sunday_closed:
-                return None
-            hours = hospital.sunday_hours
-        elif weekday == 5:  # 토요일
-            hours = hospital.saturday_hours
-        else:  # 평일
-            day_key = ['mon', 'tue', 'wed', 'thu', 'fri'][weekday]
-            hours = hospital.weekday_hours.get(day_key) if hospital.weekday_hours else None
-            
-        if not hours:
-            return None
-            
-        return int(datetime.strptime(normalize_time(hours['end']), '%H:%M').strftime('%H%M'))
-    except:
-        return None
+    """병원의 영업 종료 시간을 가져옴 (HHMM 정수, 해당 요일 진료 일정이 없으면 None)"""
+    schedule = schedule_for(hospital, effective_weekday(target_date))
+    return to_hhmm(schedule.close_min) if schedule else None
 
 # 병원 검색 도구 개선
 @tool
@@ -279,19 +193,25 @@ def search_hospital(query: str = "", latitude: float = None, longitude: float =
         if target_time:
             target_date = parse_target_time(target_time)
             
-        # 기본 쿼리
-        hospitals = Hospital.objects.annotate(
-            distance=ACos(
-                Cos(Radians(latitude)) * 
-                Cos(Radians(F('latitude'))) * 
-                Cos(Radians(F('longitude')) - Radians(longitude)) + 
-                Sin(Radians(latitude)) * 
-                Sin(Radians(F('latitude')))
-            ) * 6371
-        ).filter(distance__lte=3)
-
+        # 기본 쿼리 (공간 인덱스로 3km 이내 병원 ID만 찾아서 조회, 요일별 진료 일정 함께 조회)
+        hospitals = Hospital.objects.prefetch_related('schedules')
         if query:
             hospitals = hospitals.filter(hospital_type__icontains=query)
+        if sort_by in ("earliest_open", "latest_close"):
+            # 3km 이내 병원 중 그날 진료 시작/종료 시간 순으로 5개만 DB에서 정렬해서 조회 (진료 일정 인덱스 사용)
+            order = ('open_min', 'id') if sort_by == "earliest_open" else ('-close_min', 'id')
+            hospitals = ranked_hospitals_within(
+                latitude, longitude, 3,
+                hospitals.scheduled_on(target_date).order_by(*order),
+                5,
+            )
+        else:
+            # 영업 중(점심시간 포함)인 가까운 병원 5개를 찾을 때까지만 반경을 넓혀 가며 검색 (영업 여부는 진료 일정 인덱스로 필터링)
+            hospitals = nearest_matching_hospitals(
+                latitude, longitude, 5,
+                queryset=hospitals.open_at(target_date, include_lunch=True),
+                max_km=3,
+            )
 
         # 결과 처리
         results = []
@@ -373,9 +293,7 @@ def format_pharmacy_data(pharmacy, target_time=None):
     if target_time is None:
         target_time = datetime.now()
     
-    weekday = target_time.weekday()
-    target_time_str = target_time.strftime('%H%M')
-    target_time_int = int(target_time_str)
+    weekday = effective_weekday(target_time)
     
     # 요일별 시작/종료 시간
     time_mapping = {
@@ -390,20 +308,8 @@ def format_pharmacy_data(pharmacy, target_time=None):
     
     start_time, end_time = time_mapping[weekday]
     
-    # 영업 상태 확인
-    if start_time and end_time:
-        try:
-            start_int = int(start_time)
-            end_int = int(end_time)
-            
-            if start_int <= target_time_int <= end_int:
-                status = "영업중"
-            else:
-                status = "영업종료"
-        except ValueError:
-            status = "영업종료"
-    else:
-        status = "영업종료"
+    # 영업 상태 확인 (주간 영업 슬롯 비트맵에서 target_time 슬롯의 비트만 확인)
+    status = "영업중" if is_set(pharmacy.open_slots, effective_slot(target_time)) else "영업종료"
 
     return {
         "약국명": pharmacy.name,
@@ -416,7 +322,7 @@ def format_pharmacy_data(pharmacy, target_time=None):
 
 def get_pharmacy_opening_time(pharmacy, target_date):
     """약국의 영업 시작 시간을 가져옴"""
-    weekday = target_date.weekday()
+    weekday = effective_weekday(target_date)
     time_mapping = {
         0: pharmacy.mon_start,
         1: pharmacy.tue_start,
@@ -431,7 +337,7 @@ def get_pharmacy_opening_time(pharmacy, target_date):
 
 def get_pharmacy_closing_time(pharmacy, target_date):
     """약국의 영업 종료 시간을 가져옴"""
-    weekday = target_date.weekday()
+    weekday = effective_weekday(target_date)
     time_mapping = {
         0: pharmacy.mon_end,
         1: pharmacy.tue_end,
@@ -469,21 +375,19 @@ def search_pharmacy(latitude: float = None, longitude: float = None, target_time
         if target_time:
             target_date = parse_target_time(target_time)
 
-        # 약국 검색 쿼리
-        nearby_pharmacies = (
-            Pharmacy.objects
-            .annotate(
-                distance=ACos(
-                    Cos(Radians(latitude)) * 
-                    Cos(Radians(F('latitude'))) * 
-                    Cos(Radians(F('longitude')) - Radians(longitude)) + 
-                    Sin(Radians(latitude)) * 
-                    Sin(Radians(F('latitude')))
-                ) * 6371
+        # 약국 검색 쿼리 (조건을 만족하는 약국을 k개 찾을 때까지만 반경을 넓혀 가며 검색)
+        if sort_by in ("earliest_open", "latest_close"):
+            nearby_pharmacies = Pharmacy.objects.nearest(
+                latitude, longitude, 10,
+                predicate=lambda p: get_pharmacy_opening_time(p, target_date) is not None,
+                max_km=10,
+            )
+        else:
+            nearby_pharmacies = Pharmacy.objects.nearest(
+                latitude, longitude, 5,
+                predicate=lambda p: format_pharmacy_data(p, target_date)["영업 상태"] == "영업중",
+                max_km=10,
             )
-            .filter(distance__lte=10)
-            .order_by('distance')[:10]
-        )
 
         # 결과 처리
         results = []
@@ -7,6 +7,8 @@ from rest_framework import status
 from dotenv import load_dotenv
 import os
 
+from icare import http_client, rate_limit
+
 # .env 파일 로드
 load_dotenv()
 
@@ -42,7 +44,7 @@ class DrugSearchAPIView(APIView):
         }
         
         try:
-            response = requests.get(base_url, params=params)
+            response = http_client.get('drug', base_url, params=params)
             response.raise_for_status()
             
             # XML 응답을 dict로 파싱
@@ -82,6 +84,14 @@ class DrugSearchAPIView(APIView):
                 "data": results
             }, status=status.HTTP_200_OK)
         
+        except rate_limit.QuotaExceeded as e:
+            return Response({
+                "type": "error",
+                "message": "오늘 약 정보 조회 가능 횟수를 모두 사용했습니다.",
+                "error_details": str(e),
+                "data": []
+            }, status=status.HTTP_200_OK)  # 한도 초과도 200으로 반환
+        
         except requests.exceptions.RequestException as e:
             return Response({
                 "type": "error",
@@ -0,0 +1,145 @@
+"""
+여러 위치 일괄 검색 API
+
+집/어린이집/조부모 댁처럼 여러 위치의 근처 병원/약국을 한 번의 요청으로 조회한다.
+각 위치별 검색은 같은 병원 인덱스/약국 스냅샷을 사용하고, 병원 상세 정보는
+모든 위치의 결과 ID를 모아 한 번의 쿼리로 가져온다. 약국은 스냅샷만으로 응답하므로 DB를 조회하지 않는다.
+"""
+from datetime import datetime
+
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import serializers, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from searchHospital import spatial_index
+from searchHospital.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from searchHospital.schedule import STATE_OPEN
+from searchHospital.models import Hospital
+from searchHospital.views import HospitalSearchView
+from searchPharmacy.snapshot import get_snapshot
+from searchPharmacy.views import format_pharmacy_data
+
+MAX_LOCATIONS = 10
+
+KIND_HOSPITAL = 'hospital'
+KIND_OPEN_HOSPITAL = 'open_hospital'
+KIND_PHARMACY = 'pharmacy'
+KIND_OPEN_PHARMACY = 'open_pharmacy'
+KINDS = [KIND_HOSPITAL, KIND_OPEN_HOSPITAL, KIND_PHARMACY, KIND_OPEN_PHARMACY]
+
+# 약국 검색 기준 (단일 위치 API와 동일)
+PHARMACY_RADIUS_KM = 10
+NEARBY_PHARMACY_COUNT = 5
+
+
+class LocationSerializer(serializers.Serializer):
+    label = serializers.CharField(required=False, allow_blank=True, max_length=50)
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+
+
+class BatchSearchSerializer(serializers.Serializer):
+    locations = LocationSerializer(many=True, allow_empty=False, max_length=MAX_LOCATIONS)
+    kinds = serializers.ListField(
+        child=serializers.ChoiceField(choices=KINDS),
+        required=False,
+        allow_empty=False,
+        default=[KIND_HOSPITAL, KIND_PHARMACY],
+    )
+    radius = serializers.FloatField(required=False, default=3, min_value=0.1, max_value=20)  # 병원 검색 반경 (km)
+    page_size = serializers.IntegerField(required=False, default=DEFAULT_PAGE_SIZE, min_value=1, max_value=MAX_PAGE_SIZE)
+
+
+class BatchFacilitySearchView(APIView):
+    """여러 위치의 병원/약국을 한 번에 조회하는 API"""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="여러 위치 병원/약국 일괄 조회",
+        operation_description=(
+            "여러 위치(최대 10개)의 근처 병원/약국 목록을 한 번에 반환합니다. "
+            f"kinds: {', '.join(KINDS)} (기본값 hospital, pharmacy)"
+        ),
+        request_body=BatchSearchSerializer,
+        responses={
+            200: openapi.Response(description="위치별 검색 결과 (요청한 locations 순서)"),
+            400: "잘못된 요청",
+        },
+        tags=['search'],
+    )
+    def post(self, request):
+        serializer = BatchSearchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        kinds = set(data['kinds'])
+        locations = data['locations']
+        now = datetime.now()
+
+        results = [
+            {
+                'label': location.get('label', ''),
+                'latitude': location['latitude'],
+                'longitude': location['longitude'],
+            }
+            for location in locations
+        ]
+        if kinds & {KIND_HOSPITAL, KIND_OPEN_HOSPITAL}:
+            self.search_hospitals(results, locations, kinds, data['radius'], data['page_size'], now)
+        if kinds & {KIND_PHARMACY, KIND_OPEN_PHARMACY}:
+            self.search_pharmacies(results, locations, kinds, now)
+
+        return Response({'count': len(results), 'results': results})
+
+    def search_hospitals(self, results, locations, kinds, radius, page_size, now):
+        """위치별 반경 내 병원 검색 (상세 정보는 모든 위치의 병원 ID를 모아 한 번에 조회)"""
+        index = spatial_index.get_index()
+        pairs_by_location = [
+            index.query_radius(location['latitude'], location['longitude'], radius)
+            for location in locations
+        ]
+
+        # 영업중 필터는 반경 내 모든 병원, 일반 목록은 첫 페이지만 필요
+        ids = set()
+        for pairs in pairs_by_location:
+            needed = pairs if KIND_OPEN_HOSPITAL in kinds else pairs[:page_size]
+            ids.update(pk for pk, _ in needed)
+        hospitals = Hospital.objects.in_bulk(ids)
+
+        base_view = HospitalSearchView()
+        for result, pairs in zip(results, pairs_by_location):
+            states = {}
+            serialized = []
+            for pk, distance in pairs:
+                hospital = hospitals.get(pk)
+                if hospital is None:
+                    continue
+                hospital.distance = distance
+                state = base_view.get_hospital_state(hospital, now)
+                states[pk] = state
+                serialized.append((pk, base_view.serialize_hospital(hospital, state)))
+
+            if KIND_HOSPITAL in kinds:
+                page = [item for _, item in serialized[:page_size]]
+                result[KIND_HOSPITAL] = {'count': len(pairs), 'results': page}
+            if KIND_OPEN_HOSPITAL in kinds:
+                open_hospitals = [item for pk, item in serialized if states[pk] == STATE_OPEN]
+                result[KIND_OPEN_HOSPITAL] = {'count': len(open_hospitals), 'results': open_hospitals}
+
+    def search_pharmacies(self, results, locations, kinds, now):
+        """위치별 약국 검색 (스냅샷과 영업 여부 마스크를 모든 위치가 공유)"""
+        snapshot = get_snapshot()
+        open_mask = snapshot.open_mask(now) if KIND_OPEN_PHARMACY in kinds else None
+
+        for result, location in zip(results, locations):
+            lat, lon = location['latitude'], location['longitude']
+            if KIND_PHARMACY in kinds:
+                nearby = snapshot.pharmacies_within(lat, lon, PHARMACY_RADIUS_KM, limit=NEARBY_PHARMACY_COUNT)
+                result[KIND_PHARMACY] = [format_pharmacy_data(p) for p in nearby]
+            if KIND_OPEN_PHARMACY in kinds:
+                open_pharmacies = snapshot.pharmacies_within(lat, lon, PHARMACY_RADIUS_KM, mask=open_mask)
+                result[KIND_OPEN_PHARMACY] = [format_pharmacy_data(p) for p in open_pharmacies]
@@ -0,0 +1,53 @@
+"""
+데이터셋 버전 관리
+
+수집 커맨드가 DB 갱신을 마치면 버전 파일을 갱신하고,
+각 워커 프로세스는 버전 파일의 수정 시각을 비교해 메모리 인덱스를 다시 만든다.
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+
+
+def _version_path(name):
+    return os.path.join(settings.INDEX_DIR, f"{name}.version")
+
+
+def get_version(name):
+    """데이터셋의 현재 버전 (버전 파일이 없으면 0)"""
+    try:
+        return os.stat(_version_path(name)).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def bump_version(name):
+    """데이터셋 버전 갱신 (모든 워커의 인덱스를 무효화)"""
+    path = _version_path(name)
+    with open(path, 'w') as f:
+        f.write(str(time.time_ns()))
+    os.utime(path, None)
+
+
+class VersionedResource:
+    """데이터셋 버전이 바뀔 때마다 loader()로 다시 만드는 워커별 메모리 객체"""
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+
+    def get(self):
+        version = get_version(self.name)
+        if self._value is not None and self._version == version:
+            return self._value
+
+        with self._lock:
+            if self._value is None or self._version != version:
+                self._value = self.loader()
+                self._version = version
+            return self._value
@@ -0,0 +1,217 @@
+"""
+위치 기반 검색용 공용 QuerySet
+
+within_km()는 먼저 반경을 덮는 지오해시 셀 목록(geohash IN (...))과 위도/경도 범위
+(bounding box)로 후보를 좁혀 인덱스를 타게 하고, 남은 후보는 수집 시점에 저장해 둔
+단위 벡터(unit_x, unit_y, unit_z)와의 내적으로 판별한다.
+두 지점의 내적은 사이 각도의 cos 값이므로 "거리 <= r"은 "내적 >= cos(r / R)"과 같고,
+행마다 삼각함수를 계산할 필요 없이 곱셈과 덧셈만으로 필터링/정렬할 수 있다.
+"""
+import math
+
+from django.db import models
+from django.db.models import F
+from django.db.models.functions import ACos, Least
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# 저장하는 지오해시 길이 (5자리 셀 ≈ 3.9km x 4.9km, 서울 위도 기준)
+GEOHASH_PRECISION = 5
+# 셀이 이보다 많이 필요하면 (반경이 큰 경우) 위도/경도 범위 조건만 사용
+MAX_GEOHASH_CELLS = 64
+
+_GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def bounding_box(lat, lon, radius_km):
+    """중심점에서 radius_km 이내를 모두 포함하는 (최소위도, 최대위도, 최소경도, 최대경도)"""
+    lat_delta = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(lat))
+    if abs(lat) + lat_delta >= 90 or cos_lat <= 0:
+        lon_delta = 180
+    else:
+        lon_delta = min(180, lat_delta / cos_lat)
+    return lat - lat_delta, lat + lat_delta, lon - lon_delta, lon + lon_delta
+
+
+def encode_geohash(lat, lon, precision=GEOHASH_PRECISION):
+    """위도/경도를 지오해시 문자열로 변환"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # 짝수 번째 비트는 경도
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if lon >= mid:
+                bits = bits * 2 + 1
+                lon_range[0] = mid
+            else:
+                bits = bits * 2
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = bits * 2 + 1
+                lat_range[0] = mid
+            else:
+                bits = bits * 2
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision=GEOHASH_PRECISION):
+    """지오해시 셀 한 칸의 (위도 크기, 경도 크기) (도 단위)"""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180 / 2 ** lat_bits, 360 / 2 ** lon_bits
+
+
+def geohash_cells(lat, lon, radius_km, precision=GEOHASH_PRECISION):
+    """반경 radius_km 원을 덮는 지오해시 셀 목록"""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    min_lon, max_lon = max(min_lon, -180.0), min(max_lon, 180.0)
+    cell_lat, cell_lon = geohash_cell_size(precision)
+
+    # 범위의 모서리가 속한 셀부터 한 칸씩 이동하며 셀 중심점을 인코딩
+    first_row = math.floor((min_lat + 90) / cell_lat)
+    last_row = math.floor((max_lat + 90) / cell_lat)
+    first_col = math.floor((min_lon + 180) / cell_lon)
+    last_col = math.floor((max_lon + 180) / cell_lon)
+
+    cells = []
+    for row in range(first_row, last_row + 1):
+        center_lat = min(-90 + (row + 0.5) * cell_lat, 90 - cell_lat / 2)
+        for col in range(first_col, last_col + 1):
+            center_lon = min(-180 + (col + 0.5) * cell_lon, 180 - cell_lon / 2)
+            cells.append(encode_geohash(center_lat, center_lon, precision))
+    return sorted(set(cells))
+
+
+def unit_vector(lat, lon):
+    """위도/경도를 단위 구 위의 (x, y, z) 좌표로 변환"""
+    lat_rad = math.radians(lat)
+    lon_rad = math.radians(lon)
+    return (
+        math.cos(lat_rad) * math.cos(lon_rad),
+        math.cos(lat_rad) * math.sin(lon_rad),
+        math.sin(lat_rad),
+    )
+
+
+def location_fields(lat, lon):
+    """수집 시점에 함께 저장하는 위치 파생 필드 (지오해시, 단위 벡터)"""
+    x, y, z = unit_vector(lat, lon)
+    return {
+        'geohash': encode_geohash(lat, lon),
+        'unit_x': x,
+        'unit_y': y,
+        'unit_z': z,
+    }
+
+
+def dot_product_expression(lat, lon):
+    """(lat, lon)의 단위 벡터와 각 행의 단위 벡터의 내적 (= 사이 각도의 cos) DB 표현식"""
+    x, y, z = unit_vector(lat, lon)
+    return F('unit_x') * x + F('unit_y') * y + F('unit_z') * z
+
+
+def expanding_search(fetch_ring, k, predicate=None, start_km=0.5, max_km=10):
+    """반경을 두 배씩 넓혀 가며 predicate를 만족하는 가장 가까운 k개를 찾음
+
+    fetch_ring(inner_km, outer_km)은 거리가 inner_km 초과 outer_km 이하인 행을
+    거리순으로 반환해야 한다. 안쪽 고리부터 차례로 검사하므로 k개를 채운 순간
+    그보다 가까운 후보는 모두 확인된 상태이고, max_km에 닿으면 찾은 만큼만 반환한다.
+    """
+    matches = []
+    if k <= 0:
+        return matches
+
+    inner_km = 0
+    outer_km = min(start_km, max_km)
+    while True:
+        for row in fetch_ring(inner_km, outer_km):
+            if predicate is None or predicate(row):
+                matches.append(row)
+                if len(matches) >= k:
+                    return matches
+        if outer_km >= max_km:
+            return matches
+        inner_km, outer_km = outer_km, min(outer_km * 2, max_km)
+
+
+class GeoQuerySet(models.QuerySet):
+    def within_bbox(self, lat, lon, radius_km):
+        """인덱스를 탈 수 있는 위도/경도 범위 조건만 적용"""
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+        return self.filter(
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lon, max_lon),
+        )
+
+    def within_cells(self, lat, lon, radius_km):
+        """반경을 덮는 지오해시 셀에 속한 행만 남김 (셀이 너무 많으면 그대로 반환)"""
+        cells = geohash_cells(lat, lon, radius_km)
+        if len(cells) > MAX_GEOHASH_CELLS:
+            return self
+        return self.filter(geohash__in=cells)
+
+    def within_km(self, lat, lon, radius_km):
+        """반경 radius_km 이내의 행을 distance(km) 주석과 함께 거리순으로 반환"""
+        min_dot = math.cos(min(radius_km / EARTH_RADIUS_KM, math.pi))
+        return (
+            self.within_cells(lat, lon, radius_km)
+            .within_bbox(lat, lon, radius_km)
+            .annotate(dot=dot_product_expression(lat, lon))
+            .filter(dot__gte=min_dot)
+            # 거리 계산(ACos)은 필터를 통과한 행에만 적용됨
+            .annotate(distance=ACos(Least(F('dot'), 1.0)) * EARTH_RADIUS_KM)
+            .order_by('-dot', 'id')
+        )
+
+    def within_ring(self, lat, lon, inner_km, outer_km):
+        """거리가 inner_km 초과 outer_km 이하인 행을 거리순으로 반환"""
+        queryset = self.within_km(lat, lon, outer_km)
+        if inner_km > 0:
+            queryset = queryset.filter(dot__lt=math.cos(min(inner_km / EARTH_RADIUS_KM, math.pi)))
+        return queryset
+
+    def nearest(self, lat, lon, k, predicate=None, start_km=0.5, max_km=10):
+        """predicate(행)을 만족하는 가장 가까운 k개 (최대 max_km까지 반경을 넓혀 가며 검색)"""
+        return expanding_search(
+            lambda inner_km, outer_km: self.within_ring(lat, lon, inner_km, outer_km),
+            k,
+            predicate=predicate,
+            start_km=start_km,
+            max_km=max_km,
+        )
+
+
+GeoManager = models.Manager.from_queryset(GeoQuerySet)
+
+
+def attach_distances(queryset, pairs):
+    """메모리 인덱스가 찾은 (ID, 거리 km) 목록을 같은 순서의 모델 객체 목록으로 변환 (distance 속성 포함)"""
+    objects = queryset.in_bulk([pk for pk, _ in pairs])
+
+    results = []
+    for pk, distance in pairs:
+        obj = objects.get(pk)
+        if obj is not None:
+            obj.distance = distance
+            results.append(obj)
+    return results
@@ -0,0 +1,71 @@
+"""
+공휴일 달력과 실효 요일
+
+공휴일에는 병원/약국 모두 일요일(공휴일) 진료시간을 따르므로, 영업 상태를 판단할 때는 달력 요일 대신
+실효 요일(공휴일이면 일요일)을 쓴다. update_holidays 커맨드가 앞으로 2년치 공휴일을 PublicHoliday 테이블에
+미리 채워 두고, 각 워커는 달력을 메모리에 올려 둔 뒤 날짜나 공휴일 데이터셋 버전이 바뀔 때만 공휴일 여부를 다시 계산한다.
+버전 파일은 같은 날짜 안에서 VERSION_CHECK_SECONDS마다 한 번만 확인하므로, 영업 상태 확인(슬롯 비트맵,
+요일별 진료 일정 조회)에는 시설마다 추가 비용(파일 stat)이 없다.
+공휴일 전부휴진 병원(Hospital.holiday_closed)은 일요일 진료시간과 관계없이 공휴일에 영업종료로 판단한다.
+"""
+import threading
+import time
+from datetime import datetime
+
+from icare.dataset_version import VersionedResource, get_version
+from icare.week_slots import slot_index
+
+DATASET_NAME = 'holiday'
+CALENDAR_YEARS = 2
+SUNDAY = 6
+VERSION_CHECK_SECONDS = 10  # 같은 날짜 안에서 공휴일 데이터셋 버전 파일을 다시 확인하는 간격 (초)
+
+
+def load_holidays():
+    """PublicHoliday 테이블의 공휴일 날짜 집합"""
+    from searchHospital.models import PublicHoliday
+
+    return frozenset(PublicHoliday.objects.values_list('date', flat=True))
+
+
+_calendar = VersionedResource(DATASET_NAME, load_holidays)
+# 마지막으로 확인한 (날짜, 버전 확인 시각, 공휴일 데이터셋 버전, 공휴일 여부)
+_resolved = (None, 0.0, None, False)
+_lock = threading.Lock()
+
+
+def is_holiday(day):
+    """날짜가 공휴일인지 여부 (날짜가 바뀌었거나 버전 확인 간격이 지났을 때만 버전 파일 확인)"""
+    global _resolved
+    if isinstance(day, datetime):
+        day = day.date()
+    resolved_day, checked_at, resolved_version, holiday = _resolved
+    now = time.monotonic()
+    if resolved_day == day and now - checked_at < VERSION_CHECK_SECONDS:
+        return holiday
+
+    with _lock:
+        version = get_version(DATASET_NAME)
+        if resolved_day != day or resolved_version != version:
+            holiday = day in _calendar.get()
+        _resolved = (day, now, version, holiday)
+    return holiday
+
+
+def effective_weekday(day):
+    """날짜의 실효 요일 (공휴일이면 일요일)"""
+    if isinstance(day, datetime):
+        day = day.date()
+    return SUNDAY if is_holiday(day) else day.weekday()
+
+
+def effective_slot(when):
+    """when 시각의 주간 슬롯 번호 (공휴일이면 일요일 슬롯)"""
+    return slot_index(when, effective_weekday(when))
+
+
+def reset():
+    """기억해 둔 공휴일 여부를 버림 (다음 호출에서 버전 파일을 바로 다시 확인)"""
+    global _resolved
+    with _lock:
+        _resolved = (None, 0.0, None, False)
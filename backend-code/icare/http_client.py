@@ -0,0 +1,133 @@
+"""
+외부 API 공용 HTTP 클라이언트
+
+외부 호출(공공데이터포털, CLOVA OCR)은 모두 get()/post()를 거친다.
+- 연결 재사용: 업스트림마다 requests.Session 하나를 프로세스에서 공유하고, 호스트별 연결 풀(POOL_SIZE개)을 유지해
+  호출마다 TCP/TLS 연결을 새로 맺지 않는다.
+- 제한 시간: timeout을 주지 않으면 DEFAULT_TIMEOUT을 사용한다.
+- 재시도: GET은 연결 오류와 5xx 응답을 최대 RETRIES번, 지터를 넣은 지수 백오프로 다시 시도한다.
+  응답 읽기 시간 초과는 이미 제한 시간을 다 쓴 것이므로 다시 시도하지 않고, POST는 retries를 직접 줄 때만 다시 시도한다.
+- 호출 제한: icare.rate_limit에 등록된 업스트림은 시도할 때마다 rate_limit.acquire()를 거친다.
+- 지표: 업스트림별 호출/오류/재시도 수와 응답 시간을 세고 stats()/summary()로 확인한다.
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from icare import rate_limit
+
+POOL_SIZE = 32  # 호스트별로 유지할 연결 수 (수집 커맨드의 동시 작업자 수 이상)
+DEFAULT_TIMEOUT = (5, 30)  # (연결, 응답 읽기) 제한 시간 (초)
+RETRIES = 2  # 첫 시도 이후 다시 시도할 횟수
+BACKOFF_BASE = 0.5  # 첫 재시도 전 최대 대기 시간 (초, 재시도마다 두 배)
+BACKOFF_MAX = 8
+
+_sessions = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+class UpstreamStats:
+    """업스트림 하나의 호출 지표 (시도 단위)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0  # 연결 오류/시간 초과/5xx 응답
+        self.retries = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, latency, error, retry):
+        with self.lock:
+            self.calls += 1
+            self.errors += error
+            self.retries += retry
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'retries': self.retries,
+                'avg_ms': self.total_latency / self.calls * 1000 if self.calls else 0.0,
+                'max_ms': self.max_latency * 1000,
+            }
+
+
+def session(upstream):
+    """업스트림이 공유하는 세션 (처음 부를 때 연결 풀과 함께 생성)"""
+    with _lock:
+        if upstream not in _sessions:
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            new_session = requests.Session()
+            new_session.mount('http://', adapter)
+            new_session.mount('https://', adapter)
+            _sessions[upstream] = new_session
+            _stats[upstream] = UpstreamStats()
+        return _sessions[upstream]
+
+
+def backoff(attempt):
+    """attempt번째 재시도 전 대기 시간 (0 ~ BACKOFF_BASE * 2^attempt 사이 임의 값)"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def request(upstream, method, url, retries=None, **kwargs):
+    """upstream 이름으로 지표를 남기며 요청 (재시도 후에도 실패하면 마지막 예외를 던지거나 마지막 5xx 응답 반환)"""
+    client = session(upstream)
+    stats = _stats[upstream]
+    if retries is None:
+        retries = RETRIES if method == 'GET' else 0
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+
+    for attempt in range(retries + 1):
+        last = attempt == retries
+        if upstream in rate_limit.DEFAULT_LIMITS:
+            rate_limit.acquire(upstream)
+        started = time.perf_counter()
+        try:
+            response = client.request(method, url, **kwargs)
+        except requests.exceptions.ConnectionError:
+            stats.record(time.perf_counter() - started, True, not last)
+            if last:
+                raise
+        except requests.exceptions.RequestException:
+            stats.record(time.perf_counter() - started, True, False)
+            raise
+        else:
+            server_error = response.status_code >= 500
+            stats.record(time.perf_counter() - started, server_error, server_error and not last)
+            if not server_error or last:
+                return response
+            response.close()
+        time.sleep(backoff(attempt))
+
+
+def get(upstream, url, **kwargs):
+    return request(upstream, 'GET', url, **kwargs)
+
+
+def post(upstream, url, **kwargs):
+    return request(upstream, 'POST', url, **kwargs)
+
+
+def stats():
+    """업스트림별 호출 지표 {업스트림: {'calls', 'errors', 'retries', 'avg_ms', 'max_ms'}}"""
+    with _lock:
+        upstreams = dict(_stats)
+    return {upstream: upstream_stats.as_dict() for upstream, upstream_stats in upstreams.items()}
+
+
+def summary():
+    """업스트림별 호출 지표를 한 줄씩 정리한 문자열 목록 (수집 커맨드 출력용)"""
+    return [
+        f"{upstream}: {s['calls']}회 호출, 오류 {s['errors']}회, 재시도 {s['retries']}회, "
+        f"평균 {s['avg_ms']:.0f}ms, 최대 {s['max_ms']:.0f}ms"
+        for upstream, s in sorted(stats().items())
+    ]
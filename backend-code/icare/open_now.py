@@ -0,0 +1,67 @@
+"""
+현재 영업 중인 시설 ID 집합
+
+영업 상태는 주간 슬롯(icare.week_slots, 10분 단위) 경계에서만 바뀌므로, 스케줄러가 슬롯이 바뀔 때마다
+데이터셋별로 "지금 영업 중인 시설 ID"(정렬된 int64 배열)를 한 번 계산해서 캐시에 올려 둔다.
+영업중 목록 API는 반경 내 시설 ID를 이 집합과 교차시키기만 하면 된다.
+
+캐시 값에는 계산한 슬롯 번호와 데이터셋 버전이 함께 들어 있어, 슬롯이 지났거나 수집 커맨드가
+데이터셋 버전을 올렸으면 (스케줄러가 아직 돌지 않았더라도) 요청한 워커가 직접 다시 계산해서 올린다.
+"""
+from datetime import datetime
+
+import numpy as np
+from django.core.cache import cache
+
+from icare.dataset_version import get_version
+from icare.holidays import effective_slot
+from icare.week_slots import SLOT_MINUTES
+
+CACHE_KEY_PREFIX = 'open_now'
+# 스케줄러가 멈춰도 다음 슬롯까지만 쓰이도록 두 슬롯 동안만 보관
+CACHE_TIMEOUT = 2 * SLOT_MINUTES * 60
+
+
+def _cache_key(name):
+    return f"{CACHE_KEY_PREFIX}:{name}"
+
+
+def refresh(name, compute, now=None):
+    """compute(now)로 지금 영업 중인 시설 ID를 계산해서 캐시에 올리고 반환"""
+    if now is None:
+        now = datetime.now()
+    version = get_version(name)
+    ids = np.sort(np.asarray(compute(now), dtype=np.int64))
+    cache.set(
+        _cache_key(name),
+        {'slot': effective_slot(now), 'version': version, 'ids': ids.tobytes()},
+        CACHE_TIMEOUT,
+    )
+    return ids
+
+
+def get_open_ids(name, compute, now=None):
+    """지금 영업 중인 시설 ID (정렬된 배열, 캐시가 없거나 오래됐으면 다시 계산)"""
+    if now is None:
+        now = datetime.now()
+    entry = cache.get(_cache_key(name))
+    if entry is not None and entry['slot'] == effective_slot(now) and entry['version'] == get_version(name):
+        return np.frombuffer(entry['ids'], dtype=np.int64)
+    return refresh(name, compute, now)
+
+
+def contains(open_ids, ids):
+    """ids 각각이 정렬된 open_ids 안에 있는지 여부 (bool 배열)"""
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(open_ids):
+        return np.zeros(len(ids), dtype=bool)
+    positions = np.minimum(np.searchsorted(open_ids, ids), len(open_ids) - 1)
+    return open_ids[positions] == ids
+
+
+def intersect(pairs, open_ids):
+    """(ID, 거리) 목록 중 open_ids에 있는 항목만 (순서 유지)"""
+    if not pairs:
+        return []
+    found = contains(open_ids, [pk for pk, _ in pairs])
+    return [pair for pair, is_open in zip(pairs, found) if is_open]
@@ -0,0 +1,87 @@
+"""
+유한 큐 파이프라인
+
+수집 커맨드의 단계(조회 → 가공 → 저장)를 단계마다 스레드 하나로 돌리고, 단계 사이를 크기가 정해진 큐로 잇는다.
+큐가 차면 앞 단계가 기다리므로 메모리에는 (큐 크기 x 단계 수)개의 묶음만 올라가고,
+뒤 단계의 DB 저장과 앞 단계의 다음 묶음 네트워크 조회가 겹쳐서 실행된다.
+한 단계에서 예외가 나면 모든 단계를 멈추고 run_pipeline()이 그 예외를 다시 던진다.
+"""
+import queue
+import threading
+
+from django.db import connections
+
+QUEUE_SIZE = 2  # 단계 사이에 쌓아 둘 수 있는 묶음 수
+POLL_SECONDS = 0.1
+
+_DONE = object()
+
+
+def run_pipeline(source, stages, queue_size=QUEUE_SIZE):
+    """source의 묶음을 차례로 stages 함수에 통과시킴 (source는 호출한 스레드에서, 각 단계는 별도 스레드에서 실행)"""
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    stop = threading.Event()
+    errors = []
+
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def fail(error):
+        errors.append(error)
+        stop.set()
+
+    def work(stage, inbox, outbox):
+        try:
+            while True:
+                item = get(inbox)
+                if item is _DONE:
+                    break
+                result = stage(item)
+                if outbox is not None and not put(outbox, result):
+                    break
+        except Exception as e:
+            fail(e)
+        finally:
+            if outbox is not None:
+                put(outbox, _DONE)
+            # 단계 스레드가 연 DB 연결 정리
+            connections.close_all()
+
+    threads = [
+        threading.Thread(
+            target=work,
+            args=(stage, queues[i], queues[i + 1] if i + 1 < len(stages) else None),
+            daemon=True,
+        )
+        for i, stage in enumerate(stages)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for item in source:
+            if not put(queues[0], item):
+                break
+    except Exception as e:
+        fail(e)
+    finally:
+        put(queues[0], _DONE)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,131 @@
+"""
+공공데이터포털(data.go.kr) API 호출 제한
+
+엔드포인트마다 프로세스에 토큰 버킷 하나(초당 qps개 충전, 최대 burst개 적립)와 일일 호출 수 카운터를 두고,
+병원/약국 수집 커맨드와 약 검색 API의 모든 호출이 acquire()를 거치게 한다.
+스레드가 몇 개든 합쳐서 허용된 속도로만 호출하므로, 짐작한 sleep 없이 허용된 최대 속도로 수집한다.
+일일 한도(daily_quota)가 정해진 엔드포인트는 한도에 닿으면 호출하기 전에 QuotaExceeded를 던진다 (카운터는 날짜가 바뀌면 초기화).
+기본값은 DEFAULT_LIMITS이고, 설정의 DATA_GO_KR_RATE_LIMITS로 엔드포인트별로 덮어쓸 수 있다.
+"""
+import threading
+import time
+from datetime import date
+
+from django.conf import settings
+
+# 엔드포인트별 기본 호출 제한 (daily_quota가 None이면 일일 한도 없음)
+DEFAULT_LIMITS = {
+    'hospital_basis': {'qps': 20, 'burst': 20, 'daily_quota': None},  # 병원 기본 목록
+    'hospital_detail': {'qps': 20, 'burst': 20, 'daily_quota': None},  # 병원 상세 정보
+    'hospital_department': {'qps': 20, 'burst': 20, 'daily_quota': None},  # 병원 진료과목
+    'pharmacy': {'qps': 20, 'burst': 20, 'daily_quota': None},  # 약국 전체 목록
+    'drug': {'qps': 20, 'burst': 20, 'daily_quota': None},  # 의약품 개요 정보
+}
+
+
+class QuotaExceeded(Exception):
+    """엔드포인트의 일일 호출 한도 초과"""
+
+
+class TokenBucket:
+    """초당 rate개씩 충전되고 최대 capacity개까지 쌓이는 토큰 버킷 (여러 스레드에서 공유)"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """토큰 하나를 꺼냄 (없으면 차례가 올 때까지 대기, 대기한 초 반환)"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # 토큰이 모자라면 빚으로 미리 예약해서, 기다리는 스레드들이 차례대로 깨어나게 함
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class DailyQuota:
+    """하루 동안의 호출 수 카운터 (limit이 None이면 세기만 함)"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.day = date.today()
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def _roll(self):
+        today = date.today()
+        if today != self.day:
+            self.day, self.count = today, 0
+
+    def remaining(self):
+        with self.lock:
+            self._roll()
+            return None if self.limit is None else max(self.limit - self.count, 0)
+
+    def consume(self, name, calls=1):
+        with self.lock:
+            self._roll()
+            if self.limit is not None and self.count + calls > self.limit:
+                raise QuotaExceeded(f"{name} 일일 호출 한도 초과 ({self.count}/{self.limit}회)")
+            self.count += calls
+
+
+class Endpoint:
+    def __init__(self, name, qps, burst, daily_quota):
+        self.name = name
+        self.bucket = TokenBucket(qps, burst)
+        self.quota = DailyQuota(daily_quota)
+
+
+_endpoints = {}
+_lock = threading.Lock()
+
+
+def limits(name):
+    """엔드포인트의 호출 제한 설정 (DEFAULT_LIMITS에 설정의 DATA_GO_KR_RATE_LIMITS를 덮어씀)"""
+    if name not in DEFAULT_LIMITS:
+        raise KeyError(f"알 수 없는 API 엔드포인트: {name}")
+    overrides = {}
+    if settings.configured:  # 장고 없이 스크립트로 실행하면 기본값만 사용
+        overrides = getattr(settings, 'DATA_GO_KR_RATE_LIMITS', None) or {}
+    return {**DEFAULT_LIMITS[name], **overrides.get(name, {})}
+
+
+def endpoint(name):
+    with _lock:
+        if name not in _endpoints:
+            _endpoints[name] = Endpoint(name, **limits(name))
+        return _endpoints[name]
+
+
+def acquire(name):
+    """name 엔드포인트를 한 번 호출하기 전에 부름 (일일 한도를 넘으면 QuotaExceeded, 속도 제한에 걸리면 대기)"""
+    target = endpoint(name)
+    target.quota.consume(name)
+    return target.bucket.acquire()
+
+
+def remaining(name):
+    """오늘 남은 호출 수 (일일 한도가 없으면 None)"""
+    return endpoint(name).quota.remaining()
+
+
+def check_quota(name, calls):
+    """앞으로 calls번 호출할 만큼 일일 한도가 남았는지 확인 (모자라면 QuotaExceeded, 호출 수는 차감하지 않음)"""
+    left = remaining(name)
+    if left is not None and left < calls:
+        raise QuotaExceeded(f"{name} 일일 호출 한도 부족 (필요 {calls}회, 남은 호출 {left}회)")
+
+
+def reset():
+    """모든 엔드포인트의 버킷과 카운터를 버림 (설정을 바꾼 뒤 다시 읽을 때)"""
+    with _lock:
+        _endpoints.clear()
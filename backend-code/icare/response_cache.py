@@ -0,0 +1,104 @@
+"""
+위치 기반 목록 API 응답 캐시
+
+몇 미터 떨어진 사용자들의 근처 병원/약국 결과는 사실상 같으므로,
+사용자 위치를 격자(소수점 LOCATION_DECIMALS 자리, 약 100m)의 격자점으로 옮기고
+요청 파라미터, 시간 구간(TIME_BUCKET_MINUTES분), 데이터셋 버전을 묶어 캐시 키로 쓴다.
+뷰도 request_location()으로 같은 격자점을 기준으로 거리를 계산하므로, 캐시된 응답과 새로 계산한 응답
+(거리, 거리 기준 커서 포함)이 같은 격자 안의 누구에게나 같다.
+영업 상태는 진료/영업 시간 경계에서만 바뀌므로 같은 시간 구간 안에서는 결과가 같고,
+캐시는 시간 구간이 끝날 때 만료된다. 수집 커맨드가 데이터셋 버전을 올리면
+이전 버전의 키는 더 이상 조회되지 않는다. 영업 상태는 공휴일 달력에도 따르므로
+공휴일 데이터셋 버전은 항상 키에 포함한다.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from functools import wraps
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from icare import holidays
+from icare.dataset_version import get_version
+
+LOCATION_DECIMALS = 3
+TIME_BUCKET_MINUTES = 10
+CACHE_KEY_PREFIX = 'location_response'
+
+
+def time_bucket(now=None):
+    """현재 시각이 속한 시간 구간의 (시작 시각, 남은 초)"""
+    if now is None:
+        now = datetime.now()
+    minute = now.minute - now.minute % TIME_BUCKET_MINUTES
+    start = now.replace(minute=minute, second=0, microsecond=0)
+    end = start + timedelta(minutes=TIME_BUCKET_MINUTES)
+    return start, max(1, int((end - now).total_seconds()))
+
+
+def snap_location(lat, lon):
+    """위도/경도를 캐시 격자의 격자점으로 옮김"""
+    return round(lat, LOCATION_DECIMALS), round(lon, LOCATION_DECIMALS)
+
+
+def request_location(request):
+    """뷰가 검색 기준으로 쓸 (위도, 경도) (캐시 데코레이터를 거쳤으면 격자점, 위치 정보가 없으면 None)"""
+    location = getattr(request, 'search_location', None)
+    if location is not None:
+        return location
+    profile = getattr(request.user, 'profile', None)
+    if profile is None or not (profile.latitude and profile.longitude):
+        return None
+    return float(profile.latitude), float(profile.longitude)
+
+
+def build_cache_key(view_name, lat, lon, params, bucket_start, versions):
+    raw = '|'.join([
+        view_name,
+        f"{lat:.{LOCATION_DECIMALS}f}",
+        f"{lon:.{LOCATION_DECIMALS}f}",
+        '&'.join(f"{key}={value}" for key, value in sorted(params.items())),
+        bucket_start.strftime('%Y%m%d%H%M'),
+        ','.join(str(version) for version in versions),
+    ])
+    return f"{CACHE_KEY_PREFIX}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def cache_location_response(*dataset_names, params=('radius',)):
+    """사용자 위치 기반 GET 응답을 캐시하는 APIView 메서드 데코레이터
+
+    dataset_names: 응답이 의존하는 데이터셋 (버전이 바뀌면 캐시 무효화, 공휴일 달력은 항상 포함)
+    params: 캐시 키에 포함할 쿼리 파라미터
+    감싼 뷰는 사용자 위치 대신 request_location(request)(캐시 키와 같은 격자점)을 기준으로 계산해야 한다.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            profile = getattr(request.user, 'profile', None)
+            if profile is None or not (profile.latitude and profile.longitude):
+                return view_method(self, request, *args, **kwargs)
+
+            lat, lon = snap_location(float(profile.latitude), float(profile.longitude))
+            request.search_location = (lat, lon)
+            bucket_start, timeout = time_bucket()
+            key = build_cache_key(
+                type(self).__name__,
+                lat,
+                lon,
+                {name: request.GET[name] for name in params if name in request.GET},
+                bucket_start,
+                [get_version(name) for name in (*dataset_names, holidays.DATASET_NAME)],
+            )
+
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -37,6 +37,11 @@ LOG_DIR = os.path.join(BASE_DIR, 'logs')
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
+# 시설 검색 인덱스 디렉토리 (데이터셋 버전 파일 등)
+INDEX_DIR = os.path.join(BASE_DIR, 'index')
+if not os.path.exists(INDEX_DIR):
+    os.makedirs(INDEX_DIR)
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
@@ -124,6 +129,14 @@ DATABASES = {
         },
     }
 }
+# 캐시 (CACHE_URL 환경 변수로 redis 등 공유 캐시 지정 가능, 기본값은 프로세스 메모리)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+# 공공데이터포털 API 호출 제한 (엔드포인트별 qps/burst/daily_quota, 예: {"pharmacy": {"qps": 30, "daily_quota": 10000}})
+# 지정하지 않은 값은 icare.rate_limit.DEFAULT_LIMITS 사용
+DATA_GO_KR_RATE_LIMITS = env.json('DATA_GO_KR_RATE_LIMITS', default={})
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
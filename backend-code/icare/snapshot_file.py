@@ -0,0 +1,129 @@
+"""
+워커 간 공유용 스냅샷 파일
+
+수집 커맨드가 끝나면 병원/약국 인덱스에 필요한 배열을 하나의 파일로 기록하고,
+각 워커는 이 파일을 읽기 전용으로 mmap 해서 NumPy 배열로 바로 사용한다.
+페이지 캐시를 모든 워커가 공유하므로 워커 수만큼 메모리가 늘어나지 않는다.
+
+파일 구조:
+    MAGIC (8바이트) | 헤더 길이 (8바이트, little-endian) | 헤더 (JSON) | 배열들 (ALIGNMENT 정렬)
+
+헤더에는 배열별 dtype/shape/offset이 들어 있다. 문자열 컬럼은 UTF-8 바이트를 이어 붙인
+uint8 배열("<이름>.data")과 시작 위치 배열("<이름>.offsets")로 저장한다.
+새 파일은 같은 디렉토리의 임시 파일에 쓴 뒤 os.replace()로 교체하므로,
+읽는 쪽은 항상 완전한 이전 파일이나 새 파일 중 하나만 보게 된다.
+"""
+import json
+import mmap
+import os
+
+import numpy as np
+from django.conf import settings
+
+MAGIC = b'ICSNAP01'
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class StringColumn:
+    """고정 길이가 아닌 문자열 목록을 (바이트 배열, 시작 위치 배열)로 들고 있는 컬럼"""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_list(cls, values):
+        encoded = [(value or '').encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(value) for value in encoded], dtype=np.int64)
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(data, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+
+def write_snapshot(path, arrays, strings=None):
+    """배열(dict)과 문자열 컬럼(dict: 이름 -> StringColumn)을 스냅샷 파일로 원자적으로 기록"""
+    columns = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    for name, column in (strings or {}).items():
+        columns[f'{name}.data'] = np.ascontiguousarray(column.data)
+        columns[f'{name}.offsets'] = np.ascontiguousarray(column.offsets)
+
+    # 배열 offset은 데이터 영역 시작 기준
+    layout = {}
+    offset = 0
+    for name, array in columns.items():
+        offset = _aligned(offset)
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+    header = json.dumps({'arrays': layout, 'strings': sorted(strings or {})}).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        for name, array in columns.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SnapshotFile:
+    """읽기 전용으로 mmap 한 스냅샷 파일"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'스냅샷 파일 형식이 아닙니다: {path}')
+        header_length = int.from_bytes(self._mmap[len(MAGIC):len(MAGIC) + 8], 'little')
+        header_start = len(MAGIC) + 8
+        header = json.loads(self._mmap[header_start:header_start + header_length].decode('utf-8'))
+        data_start = _aligned(header_start + header_length)
+
+        self.arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            shape = tuple(spec['shape'])
+            count = int(np.prod(shape)) if shape else 1
+            if count == 0:
+                self.arrays[name] = np.empty(shape, dtype=dtype)
+                continue
+            array = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=data_start + spec['offset'])
+            self.arrays[name] = array.reshape(shape)
+
+        self.strings = {
+            name: StringColumn(self.arrays[f'{name}.data'], self.arrays[f'{name}.offsets'])
+            for name in header['strings']
+        }
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+
+def snapshot_path(name):
+    return os.path.join(settings.INDEX_DIR, f"{name}.snapshot")
+
+
+def open_snapshot(name, columns=()):
+    """데이터셋의 스냅샷 파일이 있으면 열고, 없거나 columns 중 빠진 배열이 있으면 (이전 형식의 파일) None"""
+    try:
+        snapshot = SnapshotFile(snapshot_path(name))
+    except FileNotFoundError:
+        return None
+    if any(column not in snapshot.arrays for column in columns):
+        return None
+    return snapshot
@@ -0,0 +1,123 @@
+"""
+섀도 테이블 교체
+
+수집 커맨드가 운영 테이블을 트랜잭션으로 오래 잡고 고치는 대신, 같은 구조의 섀도 테이블({table}_shadow)에
+새 데이터를 모두 채우고 행 수/좌표를 검증한 뒤 RENAME TABLE 한 문장으로 운영 테이블과 바꾼다.
+MySQL의 RENAME TABLE은 여러 테이블 이름을 원자적으로 바꾸므로, 읽는 쪽은 교체 순간 외에는 잠금을 기다리지 않는다.
+직전 운영 테이블은 {table}_old로 남겨 두어 rollback()으로 바로 되돌릴 수 있다.
+"""
+from django.apps.registry import Apps
+from django.db import connection, models
+
+SHADOW_SUFFIX = '_shadow'
+PREVIOUS_SUFFIX = '_old'
+
+# 섀도 테이블 검증 기준
+MIN_ROW_RATIO = 0.9  # 운영 테이블 대비 최소 행 수 비율
+MAX_INVALID_COORDINATE_RATIO = 0.01  # 국내 범위를 벗어난 좌표의 최대 비율
+KOREA_BOUNDS = (33.0, 39.0, 124.0, 132.0)  # (최소위도, 최대위도, 최소경도, 최대경도)
+
+
+class SwapError(Exception):
+    """섀도 테이블 생성/검증/교체 실패"""
+
+
+def shadow_table(model):
+    return f"{model._meta.db_table}{SHADOW_SUFFIX}"
+
+
+def previous_table(model):
+    return f"{model._meta.db_table}{PREVIOUS_SUFFIX}"
+
+
+def _execute(*statements):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def _table_exists(table):
+    with connection.cursor() as cursor:
+        return table in connection.introspection.table_names(cursor)
+
+
+def check_supported():
+    """현재 DB가 원자적 RENAME TABLE을 지원하는지 확인 (MySQL만 지원)"""
+    if connection.vendor != 'mysql':
+        raise SwapError(f"섀도 테이블 교체는 MySQL에서만 지원합니다 (현재: {connection.vendor})")
+
+
+def create_shadow(model):
+    """운영 테이블과 같은 구조(인덱스 포함)의 빈 섀도 테이블을 만들고, 그 테이블에 쓰는 모델 클래스 반환"""
+    check_supported()
+    quote = connection.ops.quote_name
+    # CREATE TABLE ... LIKE는 AUTO_INCREMENT를 1로 되돌리므로, 새로 생기는 행의 ID가
+    # 기존 ID를 유지해서 넣는 행과 겹치지 않도록 운영 테이블의 최대 ID 다음부터 시작
+    next_id = (model._default_manager.aggregate(max_id=models.Max('pk'))['max_id'] or 0) + 1
+    _execute(
+        f"DROP TABLE IF EXISTS {quote(shadow_table(model))}",
+        f"CREATE TABLE {quote(shadow_table(model))} LIKE {quote(model._meta.db_table)}",
+        f"ALTER TABLE {quote(shadow_table(model))} AUTO_INCREMENT = {int(next_id)}",
+    )
+    return shadow_model(model)
+
+
+def drop_shadow(model):
+    """섀도 테이블 삭제 (채우다 실패한 섀도 테이블 정리)"""
+    _execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(shadow_table(model))}")
+
+
+def shadow_model(model):
+    """model과 필드가 같고 섀도 테이블에 읽고 쓰는 모델 클래스 (전역 앱 레지스트리에는 등록하지 않음)"""
+    meta = type('Meta', (), {
+        'app_label': model._meta.app_label,
+        'db_table': shadow_table(model),
+        'managed': False,
+        'apps': Apps(),
+    })
+    attrs = {'__module__': model.__module__, 'Meta': meta}
+    for field in model._meta.local_fields:
+        attrs[field.name] = field.clone()
+    return type(f"{model.__name__}Shadow", (models.Model,), attrs)
+
+
+def validate_shadow(model, shadow):
+    """섀도 테이블 행 수와 좌표(latitude/longitude 필드) 검증 (기준에 못 미치면 SwapError)"""
+    live_count = model._default_manager.count()
+    shadow_count = shadow.objects.count()
+    if shadow_count == 0 or shadow_count < live_count * MIN_ROW_RATIO:
+        raise SwapError(f"섀도 테이블 행 수 부족 ({shadow_count}개, 운영 테이블 {live_count}개)")
+
+    min_lat, max_lat, min_lon, max_lon = KOREA_BOUNDS
+    invalid = shadow.objects.exclude(
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lon, max_lon),
+    ).count()
+    if invalid > shadow_count * MAX_INVALID_COORDINATE_RATIO:
+        raise SwapError(f"국내 범위를 벗어난 좌표가 너무 많음 ({invalid}/{shadow_count}개)")
+    return shadow_count
+
+
+def swap(model):
+    """섀도 테이블을 운영 테이블로 교체 (직전 운영 테이블은 {table}_old로 보관)"""
+    check_supported()
+    quote = connection.ops.quote_name
+    live, shadow, previous = model._meta.db_table, shadow_table(model), previous_table(model)
+    _execute(
+        f"DROP TABLE IF EXISTS {quote(previous)}",
+        f"RENAME TABLE {quote(live)} TO {quote(previous)}, {quote(shadow)} TO {quote(live)}",
+    )
+
+
+def rollback(model):
+    """직전 교체를 되돌림 ({table}_old와 운영 테이블을 맞바꿈)"""
+    check_supported()
+    quote = connection.ops.quote_name
+    live, shadow, previous = model._meta.db_table, shadow_table(model), previous_table(model)
+    if not _table_exists(previous):
+        raise SwapError(f"되돌릴 이전 테이블이 없습니다 ({previous})")
+    _execute(
+        f"DROP TABLE IF EXISTS {quote(shadow)}",
+        f"RENAME TABLE {quote(live)} TO {quote(shadow)}, {quote(previous)} TO {quote(live)}, "
+        f"{quote(shadow)} TO {quote(previous)}",
+    )
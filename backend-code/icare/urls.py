@@ -22,6 +22,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from .batch_search import BatchFacilitySearchView
+
 schema_view = get_schema_view(
     openapi.Info(
         title="icare API", default_version="v1", description="아이케어 API 문서"
@@ -39,6 +41,7 @@ urlpatterns = [
     path("hospital/", include("searchHospital.urls")),
     path("pharmacy/", include("searchPharmacy.urls")),
     path("drug/", include("drugapp.urls")),
+    path("search/batch/", BatchFacilitySearchView.as_view(), name="batch-facility-search"),
     
     # Swagger 및 ReDoc 경로
     re_path(
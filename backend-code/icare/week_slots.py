@@ -0,0 +1,71 @@
+"""
+주간 영업 슬롯 비트맵
+
+일주일을 10분 단위 슬롯 7 x 144개로 나누고, 슬롯마다 1비트를 써서 126바이트 비트맵으로 저장한다.
+수집 시 병원/약국의 영업(점심) 시간을 비트맵으로 만들어 두면, 요청 시 "지금/내일 오전 10시에 영업 중인가"는
+문자열 파싱이나 요일별 분기 없이 비트 하나를 확인하는 것으로 끝난다.
+
+슬롯 i는 해당 요일 자정부터 [10i, 10i + 10)분 구간이다. 영업 비트는 슬롯 전체가 영업시간 안에 있을 때만,
+점심 비트는 슬롯이 점심시간과 조금이라도 겹치면 켠다 (경계 시각에는 영업종료/점심시간 쪽으로 보수적으로 판단).
+"""
+import numpy as np
+
+SLOT_MINUTES = 10
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOT_COUNT = 7 * SLOTS_PER_DAY
+BITMAP_BYTES = SLOT_COUNT // 8
+
+EMPTY_BITMAP = bytes(BITMAP_BYTES)
+
+
+def slot_index(when, weekday=None):
+    """datetime이 속한 주간 슬롯 번호 (weekday를 주면 그 요일 기준, 공휴일 처리는 icare.holidays.effective_slot)"""
+    if weekday is None:
+        weekday = when.weekday()
+    return weekday * SLOTS_PER_DAY + (when.hour * 60 + when.minute) // SLOT_MINUTES
+
+
+def slot_start_minute(when):
+    """datetime이 속한 슬롯의 시작 시각 (자정 기준 분)"""
+    return (when.hour * 60 + when.minute) // SLOT_MINUTES * SLOT_MINUTES
+
+
+def slots_within(weekday, start_min, end_min):
+    """[start_min, end_min]분(양 끝 포함) 안에 완전히 들어가는 요일의 슬롯 번호"""
+    first = -(-start_min // SLOT_MINUTES)
+    last = min((end_min + 1) // SLOT_MINUTES - 1, SLOTS_PER_DAY - 1)
+    offset = weekday * SLOTS_PER_DAY
+    return range(offset + first, offset + last + 1)
+
+
+def slots_overlapping(weekday, start_min, end_min):
+    """[start_min, end_min]분(양 끝 포함)과 겹치는 요일의 슬롯 번호"""
+    first = start_min // SLOT_MINUTES
+    last = min(end_min // SLOT_MINUTES, SLOTS_PER_DAY - 1)
+    offset = weekday * SLOTS_PER_DAY
+    return range(offset + first, offset + last + 1)
+
+
+def build_bitmap(slots):
+    """슬롯 번호 목록으로 비트맵(bytes) 생성"""
+    bits = np.zeros(SLOT_COUNT, dtype=bool)
+    bits[list(slots)] = True
+    return np.packbits(bits, bitorder='little').tobytes()
+
+
+def is_set(bitmap, slot):
+    """비트맵에서 슬롯 비트 확인 (비트맵이 비어 있으면 False)"""
+    if not bitmap:
+        return False
+    return bool(bitmap[slot >> 3] >> (slot & 7) & 1)
+
+
+def bitmap_array(bitmaps):
+    """비트맵 목록을 (개수, BITMAP_BYTES) uint8 배열로 변환 (비어 있거나 길이가 다르면 모두 0)"""
+    rows = [bytes(bitmap) if bitmap and len(bitmap) == BITMAP_BYTES else EMPTY_BITMAP for bitmap in bitmaps]
+    return np.frombuffer(b''.join(rows), dtype=np.uint8).reshape(-1, BITMAP_BYTES)
+
+
+def mask_at(array, slot):
+    """bitmap_array 배열의 각 행에서 슬롯 비트 확인"""
+    return ((array[:, slot >> 3] >> (slot & 7)) & 1).astype(bool)
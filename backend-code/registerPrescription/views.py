@@ -1,7 +1,6 @@
 import os
 import time
 import uuid
-import requests
 import logging
 import base64
 import json
@@ -25,6 +24,8 @@ from django.db import connection
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
+from icare import http_client
+
 logger = logging.getLogger(__name__)
 
 # 환경 변수 로드
@@ -39,6 +40,7 @@ openai.api_key = OPENAI_API_KEY
 
 # APIGW에서 제공하는 실제 Invoke URL (NCP 콘솔에서 확인한 URL로 교체)
 OCR_API_URL = "https://3ja254nf6l.apigw.ntruss.com/custom/v1/38065/f6e2a7f6d39340c1a967762f8265e55ed0cf9e441f30ee185ba6a26df73d34db/general"
+OCR_TIMEOUT = (5, 60)  # (연결, 응답 읽기) 제한 시간 (초), 큰 이미지는 인식에 시간이 걸림
 
 
 class ClovaOCRAPIView(APIView):
@@ -80,7 +82,7 @@ class ClovaOCRAPIView(APIView):
             }
 
             # OCR API 호출
-            response = requests.post(OCR_API_URL, headers=headers, files=files)
+            response = http_client.post('clova_ocr', OCR_API_URL, headers=headers, files=files, timeout=OCR_TIMEOUT)
             
             if response.status_code != 200:
                 return Response({
@@ -18,6 +18,9 @@ import json
 import time
 from django.db import transaction
 from searchHospital.models import Hospital
+from searchHospital import spatial_index
+from searchHospital.schedule import save_schedules
+from icare.geo import location_fields
 from openai import OpenAI
 
 def process_treatment_hours(row):
@@ -382,6 +385,7 @@ def process_hospitals_file(input_file: str, output_file: str):
                             'phone': row['phone'],
                             'latitude': float(row['latitude']),
                             'longitude': float(row['longitude']),
+                            **location_fields(float(row['latitude']), float(row['longitude'])),
                             'department': row['departments'],
                             'hospital_type': hospital_type,
                             'weekday_hours': weekday_hours,
@@ -393,6 +397,8 @@ def process_hospitals_file(input_file: str, output_file: str):
                             'holiday_info': holiday_data['holiday_info'],
                         }
                     )
+                    # 요일별 진료 일정 (요청 시 시간 문자열을 다시 파싱하지 않도록 분 단위로 저장)
+                    save_schedules(hospital)
                     
                     if created:
                         created_count += 1
@@ -403,6 +409,7 @@ def process_hospitals_file(input_file: str, output_file: str):
                     continue
 
         print(f"DB 저장 완료! (생성: {created_count}개, 업데이트: {updated_count}개)")
+        spatial_index.invalidate()
         
     except Exception as e:
         print(f"DB 저장 중 오류 발생: {str(e)}")
@@ -1,12 +1,19 @@
-from django.core.management.base import BaseCommand
-import requests
+from django.core.management.base import BaseCommand, CommandError
 import xml.etree.ElementTree as ET
+import hashlib
 import json
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List
-from django.db import transaction
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from django.db import connection, transaction
+from django.utils import timezone
 from searchHospital.models import Hospital
+from searchHospital import spatial_index
+from searchHospital.schedule import replace_schedules, schedule_bitmaps, schedule_rows
+from icare.geo import location_fields
+from icare import http_client, rate_limit
+from icare.pipeline import run_pipeline
 from searchHospital.data_processor import (
     process_treatment_hours,
     process_reception_hours,
@@ -20,6 +27,38 @@ from dotenv import load_dotenv
 # 환경 변수 로드
 load_dotenv()
 
+# 이미 있는 병원(ykiho 기준)이면 덮어쓰는 필드
+UPSERT_FIELDS = [
+    'name', 'address', 'phone', 'latitude', 'longitude', 'geohash', 'unit_x', 'unit_y', 'unit_z',
+    'department', 'hospital_type', 'weekday_hours', 'saturday_hours', 'sunday_hours',
+    'reception_hours', 'lunch_time', 'sunday_closed', 'holiday_closed', 'holiday_info',
+    'open_slots', 'lunch_slots', 'basis_hash', 'details_fetched_at', 'updated_at',
+]
+# 상세/진료과목 조회에 실패한 기존 병원은 기본 정보 필드만 덮어씀
+# (저장된 진료시간/진료과목을 지우지 않고, 지문과 조회 시각도 그대로 두어 다음 증분 갱신 때 다시 조회)
+BASIS_UPDATE_FIELDS = [
+    'name', 'address', 'phone', 'latitude', 'longitude', 'geohash', 'unit_x', 'unit_y', 'unit_z', 'updated_at',
+]
+# 기본 정보 지문에 쓰는 필드 (getHospBasisList 응답)
+BASIS_FIELDS = ['name', 'address', 'phone', 'latitude', 'longitude']
+DETAIL_MAX_AGE_DAYS = 30  # 증분 갱신 시 기본 정보가 그대로여도 상세 정보를 다시 조회하는 주기
+
+
+def upsert_options(update_fields: List[str] = UPSERT_FIELDS) -> Dict:
+    """ykiho 기준 일괄 upsert용 bulk_create 인자
+    (MySQL은 충돌 대상을 지정할 수 없고 ON DUPLICATE KEY UPDATE가 유일 키인 ykiho로 충돌을 판단하므로 unique_fields 생략)"""
+    options = {'update_conflicts': True, 'update_fields': update_fields}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['ykiho']
+    return options
+
+
+def basis_hash(hospital: Dict) -> str:
+    """병원 기본 정보의 지문 (이전 수집 때와 같으면 상세/진료과목 정보를 다시 조회하지 않음)"""
+    values = '\x1f'.join(repr(hospital[field]) for field in BASIS_FIELDS)
+    return hashlib.sha1(values.encode()).hexdigest()
+
+
 class Command(BaseCommand):
     help = '공공데이터 포털 API에서 병원 데이터를 수집하고 DB에 저장'
 
@@ -48,6 +87,23 @@ class Command(BaseCommand):
             default=20,
             help='동시 처리할 작업자 수 (기본값: 20)'
         )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='DB에 한 번에 저장(커밋)할 병원 수 (기본값: 1000)'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='새 병원, 기본 정보가 바뀐 병원, 상세 정보가 오래된 병원만 상세/진료과목을 조회해서 갱신'
+        )
+        parser.add_argument(
+            '--max-age-days',
+            type=int,
+            default=DETAIL_MAX_AGE_DAYS,
+            help=f'증분 갱신 시 상세 정보를 다시 조회할 기간 (기본값: {DETAIL_MAX_AGE_DAYS}일)'
+        )
         parser.add_argument(
             '--force',
             action='store_true',
@@ -56,7 +112,11 @@ class Command(BaseCommand):
 
     def fetch_hospitals_by_region(self, region: str) -> List[Dict]:
         """지역별 병원 기본 정보 수집"""
-        hospitals = []
+        return [hospital for hospitals in self.iter_hospital_pages(region) for hospital in hospitals]
+
+    def iter_hospital_pages(self, region: str) -> Iterator[List[Dict]]:
+        """지역별 병원 기본 정보를 페이지 단위로 수집"""
+        fetched = 0
         page = 1
         
         while True:
@@ -68,14 +128,15 @@ class Command(BaseCommand):
             }
             
             try:
-                response = requests.get(self.BASIS_URL, params=params)
+                response = http_client.get('hospital_basis', self.BASIS_URL, params=params)
                 root = ET.fromstring(response.content)
                 
                 items = root.findall(".//item")
                 if not items:  # 더 이상 데이터가 없으면 종료
                     break
                     
-                for item in root.findall(".//item"):
+                hospitals = []
+                for item in items:
                     hospital = {
                         "ykiho": item.findtext("ykiho", ""),
                         "name": item.findtext("yadmNm", ""),
@@ -87,22 +148,24 @@ class Command(BaseCommand):
                     if hospital["ykiho"]:  # ykiho가 있는 경우만 추가
                         hospitals.append(hospital)
                 
-                self.stdout.write(f"{region} 지역 {page}페이지 처리 완료 (병원 수: {len(hospitals)})")
-                page += 1
-                time.sleep(0.5)  # API 호출 제한 고려
+                fetched += len(hospitals)
+                self.stdout.write(f"{region} 지역 {page}페이지 처리 완료 (병원 수: {fetched})")
                 
+            except rate_limit.QuotaExceeded:
+                raise
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"Error fetching {region} page {page}: {str(e)}"))
                 break
-        
-        return hospitals
+            
+            yield hospitals
+            page += 1
 
-    def fetch_hospital_details(self, ykiho: str) -> Dict:
-        """병원 상세 정보 수집"""
+    def fetch_hospital_details(self, ykiho: str) -> Optional[Dict]:
+        """병원 상세 정보 수집 (조회 실패 시 None)"""
         params = {"ServiceKey": self.API_KEY, "ykiho": ykiho}
         
         try:
-            response = requests.get(self.DETAIL_URL, params=params)
+            response = http_client.get('hospital_detail', self.DETAIL_URL, params=params)
             root = ET.fromstring(response.content)
             item = root.find(".//item")
             
@@ -136,18 +199,21 @@ class Command(BaseCommand):
                     "noTrmtSun": item.findtext("noTrmtSun", ""),
                     "noTrmtHoli": item.findtext("noTrmtHoli", ""),
                 }
+        except rate_limit.QuotaExceeded:
+            raise
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error fetching details for {ykiho}: {str(e)}"))
+            return None
         
         return {}
 
-    def fetch_hospital_departments(self, ykiho: str) -> List[Dict]:
-        """병원 진료과목 정보 수집"""
+    def fetch_hospital_departments(self, ykiho: str) -> Optional[List[Dict]]:
+        """병원 진료과목 정보 수집 (조회 실패 시 None)"""
         params = {"ServiceKey": self.API_KEY, "ykiho": ykiho}
         departments = []
         
         try:
-            response = requests.get(self.DGSBJT_URL, params=params)
+            response = http_client.get('hospital_department', self.DGSBJT_URL, params=params)
             root = ET.fromstring(response.content)
             
             for item in root.findall(".//item"):
@@ -158,8 +224,11 @@ class Command(BaseCommand):
                 }
                 departments.append(dept)
                 
+        except rate_limit.QuotaExceeded:
+            raise
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error fetching departments for {ykiho}: {str(e)}"))
+            return None
         
         return departments
 
@@ -173,9 +242,14 @@ class Command(BaseCommand):
                 departments = self.fetch_hospital_departments(hospital["ykiho"])
                 return {
                     **hospital,
-                    "details": details,
-                    "departments": departments
+                    "details": details or {},
+                    "departments": departments or [],
+                    # 조회에 실패한 병원은 조회 시각을 남기지 않아 다음 증분 갱신 때 다시 조회
+                    "details_fetched": details is not None and departments is not None,
                 }
+            except rate_limit.QuotaExceeded:
+                # 한도 초과로 빈 상세 정보를 저장하지 않도록 파이프라인 전체를 멈춤
+                raise
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f"Error processing {hospital['name']}: {str(e)}"))
                 return hospital
@@ -184,71 +258,150 @@ class Command(BaseCommand):
         futures = [executor.submit(fetch_all_info, hospital) for hospital in hospitals]
         return [future.result() for future in as_completed(futures)]
 
-    def save_to_db(self, hospitals_data: List[Dict]):
-        """수집한 병원 데이터를 DB에 저장"""
-        created_count = 0
-        updated_count = 0
+    def build_hospital(self, hospital: Dict, hospital_type: str) -> Tuple[Hospital, List[Dict]]:
+        """수집한 병원 정보로 저장할 (Hospital 객체, 요일별 진료 일정 값 목록) 생성"""
+        # 진료시간 처리
+        weekday_hours, saturday_hours, sunday_hours = process_treatment_hours(hospital['details'])
+        
+        # 휴무일 정보 처리
+        holiday_data = process_holiday_info(hospital['details'])
+        
+        db_hospital = Hospital(
+            ykiho=hospital['ykiho'],
+            name=hospital['name'],
+            address=hospital['address'],
+            phone=hospital['phone'],
+            latitude=float(hospital['latitude']),
+            longitude=float(hospital['longitude']),
+            **location_fields(float(hospital['latitude']), float(hospital['longitude'])),
+            department=', '.join([f"{d['name']}({d['doctor_count']}명)" 
+                for d in hospital['departments']]),
+            hospital_type=hospital_type,
+            weekday_hours=weekday_hours,
+            saturday_hours=saturday_hours,
+            sunday_hours=sunday_hours,
+            reception_hours=process_reception_hours(hospital['details']),
+            lunch_time=process_lunch_time(hospital['details']),
+            sunday_closed=holiday_data['sunday_closed'],
+            holiday_closed=holiday_data['holiday_info']['fully_closed'],
+            holiday_info=holiday_data['holiday_info'],
+            basis_hash=basis_hash(hospital),
+            details_fetched_at=timezone.now() if hospital.get('details_fetched') else None,
+        )
+        # 요일별 진료 일정 (요청 시 시간 문자열을 다시 파싱하지 않도록 분 단위로 저장)과 슬롯 비트맵
+        rows = schedule_rows(db_hospital)
+        db_hospital.open_slots, db_hospital.lunch_slots = schedule_bitmaps(rows)
+        return db_hospital, rows
+
+    def save_chunk(self, entries: List[Tuple[Hospital, List[Dict]]]):
+        """(병원, 요일별 진료 일정 값) 묶음을 한 트랜잭션으로 일괄 upsert하고 진료 일정 교체 (생성 수, 갱신 수 반환)
+        상세/진료과목 조회에 실패한(details_fetched_at이 없는) 기존 병원은 기본 정보만 갱신하고 진료 일정은 그대로 둠"""
+        hospitals = [hospital for hospital, _ in entries]
+        ykihos = [hospital.ykiho for hospital in hospitals]
+        with transaction.atomic():
+            existing = set(Hospital.objects.filter(ykiho__in=ykihos).values_list('ykiho', flat=True))
+            full, basis_only = [], []
+            for hospital, rows in entries:
+                if hospital.details_fetched_at is None and hospital.ykiho in existing:
+                    basis_only.append(hospital)
+                else:
+                    full.append((hospital, rows))
+            # INSERT ... ON DUPLICATE KEY UPDATE (ykiho 기준)
+            if full:
+                Hospital.objects.bulk_create([hospital for hospital, _ in full], **upsert_options())
+            if basis_only:
+                Hospital.objects.bulk_create(basis_only, **upsert_options(BASIS_UPDATE_FIELDS))
+            # MySQL은 일괄 upsert 후 ID를 돌려주지 않으므로 ykiho로 다시 조회
+            ids = dict(Hospital.objects.filter(ykiho__in=ykihos).values_list('ykiho', 'id'))
+            replace_schedules({ids[hospital.ykiho]: rows for hospital, rows in full})
+        created = len(set(ykihos) - existing)
+        return created, len(hospitals) - created
+
+    def build_entries(self, hospitals_data: List[Dict]) -> List[Tuple[Hospital, List[Dict]]]:
+        """병원 유형을 분류하고 저장할 (병원, 요일별 진료 일정 값) 목록 생성 (같은 ykiho는 마지막 값만)"""
+        # 병원 유형 분류
+        hospitals_for_gpt = [(h['name'], 
+            ', '.join([f"{d['name']}({d['doctor_count']}명)" 
+                for d in h['departments']]))
+            for h in hospitals_data]
+        
+        hospital_types = classify_hospitals_batch(hospitals_for_gpt)
+        
+        entries = {}
+        for hospital in hospitals_data:
+            try:
+                entries[hospital['ykiho']] = self.build_hospital(
+                    hospital, hospital_types.get(hospital['name'], "일반의원")
+                )
+            except Exception as e:
+                self.stdout.write(
+                    self.style.WARNING(f"병원 데이터 저장 중 오류 ({hospital['name']}): {str(e)}")
+                )
+        return list(entries.values())
+
+    def write_entries(self, entries: List[Tuple[Hospital, List[Dict]]], chunk_size: int = 1000):
+        """(병원, 요일별 진료 일정 값) 목록을 chunk_size개씩 일괄 upsert (묶음마다 커밋, 누적 생성/갱신 수 갱신)"""
+        for i in range(0, len(entries), chunk_size):
+            chunk_start = time.time()
+            created, updated = self.save_chunk(entries[i:i+chunk_size])
+            self.created_count += created
+            self.updated_count += updated
+            
+            saved = self.created_count + self.updated_count
+            elapsed = time.time() - self.write_started
+            self.stdout.write(
+                f"DB 저장 누적 {saved}개 "
+                f"(묶음 {time.time() - chunk_start:.2f}초, 평균 {saved / max(elapsed, 1e-9):.0f}행/초)"
+            )
+
+    def save_to_db(self, hospitals_data: List[Dict], chunk_size: int = 1000):
+        """수집한 병원 데이터를 chunk_size개씩 일괄 upsert (묶음마다 커밋)"""
+        self.created_count = 0
+        self.updated_count = 0
         
         try:
-            with transaction.atomic():
-                # 병원 유형 분류
-                hospitals_for_gpt = [(h['name'], 
-                    ', '.join([f"{d['name']}({d['doctor_count']}명)" 
-                        for d in h['departments']]))
-                    for h in hospitals_data]
-                
-                hospital_types = classify_hospitals_batch(hospitals_for_gpt)
-                
-                for hospital in hospitals_data:
-                    try:
-                        # 진료시간 처리
-                        weekday_hours, saturday_hours, sunday_hours = process_treatment_hours(hospital['details'])
-                        
-                        # 휴무일 정보 처리
-                        holiday_data = process_holiday_info(hospital['details'])
-                        
-                        # 병원 유형
-                        hospital_type = hospital_types.get(hospital['name'], "일반의원")
-                        
-                        # DB 업데이트 또는 생성
-                        db_hospital, created = Hospital.objects.update_or_create(
-                            ykiho=hospital['ykiho'],
-                            defaults={
-                                'name': hospital['name'],
-                                'address': hospital['address'],
-                                'phone': hospital['phone'],
-                                'latitude': float(hospital['latitude']),
-                                'longitude': float(hospital['longitude']),
-                                'department': ', '.join([f"{d['name']}({d['doctor_count']}명)" 
-                                    for d in hospital['departments']]),
-                                'hospital_type': hospital_type,
-                                'weekday_hours': weekday_hours,
-                                'saturday_hours': saturday_hours,
-                                'sunday_hours': sunday_hours,
-                                'reception_hours': process_reception_hours(hospital['details']),
-                                'lunch_time': process_lunch_time(hospital['details']),
-                                'sunday_closed': holiday_data['sunday_closed'],
-                                'holiday_info': holiday_data['holiday_info'],
-                            }
-                        )
-                        
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                            
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.WARNING(f"병원 데이터 저장 중 오류 ({hospital['name']}): {str(e)}")
-                        )
-                        continue
-                        
-            return created_count, updated_count
+            entries = self.build_entries(hospitals_data)
+            self.write_started = time.time()
+            self.write_entries(entries, chunk_size)
+            return self.created_count, self.updated_count
             
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"DB 저장 중 오류 발생: {str(e)}"))
             raise
 
+    def select_stale(self, hospitals: List[Dict], max_age: timedelta) -> List[Dict]:
+        """상세/진료과목을 다시 조회할 병원만 골라냄 (새 병원, 기본 정보가 바뀐 병원, 마지막 조회가 max_age보다 오래된 병원)"""
+        known = {
+            ykiho: (fingerprint, fetched_at)
+            for ykiho, fingerprint, fetched_at in Hospital.objects.filter(
+                ykiho__in=[hospital['ykiho'] for hospital in hospitals]
+            ).values_list('ykiho', 'basis_hash', 'details_fetched_at')
+        }
+        cutoff = timezone.now() - max_age
+        stale = []
+        for hospital in hospitals:
+            fingerprint, fetched_at = known.get(hospital['ykiho'], (None, None))
+            if fingerprint != basis_hash(hospital) or fetched_at is None or fetched_at < cutoff:
+                stale.append(hospital)
+        self.skipped_count += len(hospitals) - len(stale)
+        return stale
+
+    def iter_batches(self, regions: List[str], batch_size: int,
+                     max_age: Optional[timedelta] = None) -> Iterator[List[Dict]]:
+        """지역별 병원 기본 정보를 batch_size개씩 묶어서 반환 (페이지를 받는 대로, max_age가 있으면 갱신할 병원만)"""
+        for region in regions:
+            self.stdout.write(f"\n{region} 지역 병원 수집 시작...")
+            batch = []
+            for hospitals in self.iter_hospital_pages(region):
+                if max_age is not None:
+                    hospitals = self.select_stale(hospitals, max_age)
+                batch.extend(hospitals)
+                while len(batch) >= batch_size:
+                    yield batch[:batch_size]
+                    batch = batch[batch_size:]
+            if batch:
+                yield batch
+
     def handle(self, *args, **options):
         start_time = time.time()
         
@@ -257,42 +410,46 @@ class Command(BaseCommand):
                 self.stdout.write('기존 데이터 삭제 중...')
                 Hospital.objects.all().delete()
             
-            all_hospitals = []
+            self.created_count = 0
+            self.updated_count = 0
+            self.skipped_count = 0
+            self.write_started = time.time()
+            max_age = timedelta(days=options['max_age_days']) if options['incremental'] else None
             
-            # 데이터 수집
+            # 기본 정보 조회 → 상세/진료과목 조회 → 유형 분류/가공 → DB 저장을 묶음 단위 파이프라인으로 동시에 실행
+            # (단계 사이 큐가 차면 앞 단계가 기다리므로 메모리에는 몇 개 묶음만 올라가고, 저장한 묶음은 바로 커밋됨)
             with ThreadPoolExecutor(max_workers=options['workers']) as executor:
-                for region in options['regions']:
-                    self.stdout.write(f"\n{region} 지역 병원 수집 시작...")
-                    hospitals = self.fetch_hospitals_by_region(region)
-                    self.stdout.write(f"{region} 지역 총 {len(hospitals)}개 병원 기본 정보 수집 완료")
-                    
-                    for i in range(0, len(hospitals), options['batch_size']):
-                        batch = hospitals[i:i+options['batch_size']]
-                        self.stdout.write(f"\n배치 처리 중... ({i+1}-{i+len(batch)}/{len(hospitals)})")
-                        processed_batch = self.process_hospital_batch(batch, executor)
-                        all_hospitals.extend(processed_batch)
-                        
-                        progress = ((i+len(batch))/len(hospitals))*100
-                        self.stdout.write(f"진행률: {progress:.1f}%")
+                run_pipeline(
+                    self.iter_batches(options['regions'], options['batch_size'], max_age),
+                    [
+                        lambda batch: self.process_hospital_batch(batch, executor),
+                        self.build_entries,
+                        lambda entries: self.write_entries(entries, options['chunk_size']),
+                    ],
+                )
             
-            # DB 저장
-            self.stdout.write("\nDB 저장 시작...")
-            created, updated = self.save_to_db(all_hospitals)
+            # 워커들의 병원 공간 인덱스 재생성
+            spatial_index.invalidate()
             
             self.stdout.write(
                 self.style.SUCCESS(
                     f"\n처리 완료!\n"
-                    f"총 병원 수: {len(all_hospitals)}\n"
-                    f"새로 생성: {created}개\n"
-                    f"업데이트: {updated}개"
+                    f"총 병원 수: {self.created_count + self.updated_count}\n"
+                    f"새로 생성: {self.created_count}개\n"
+                    f"업데이트: {self.updated_count}개\n"
+                    f"변경 없음(건너뜀): {self.skipped_count}개"
                 )
             )
             
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"오류 발생: {str(e)}"))
+            # 스케줄러 작업과 호출한 쪽에서 실패를 알 수 있도록 다시 던짐
+            raise CommandError(f"병원 데이터 수집 실패: {str(e)}") from e
             
         finally:
             end_time = time.time()
+            for line in http_client.summary():
+                self.stdout.write(line)
             self.stdout.write(
                 self.style.SUCCESS(f"총 처리 시간: {end_time - start_time:.2f}초")
             ) 
\ No newline at end of file
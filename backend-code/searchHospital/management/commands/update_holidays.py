@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from icare import holidays
+from icare.dataset_version import bump_version
+from searchHospital.models import PublicHoliday
+
+
+class Command(BaseCommand):
+    help = '앞으로 지정한 기간(기본 2년)의 공휴일 달력을 PublicHoliday 테이블에 저장'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--years',
+            type=int,
+            default=holidays.CALENDAR_YEARS,
+            help=f'오늘부터 저장할 기간 (년, 기본값: {holidays.CALENDAR_YEARS})'
+        )
+
+    def handle(self, *args, **options):
+        # holidayskr는 임포트할 때 공휴일 데이터를 내려받으므로 커맨드 실행 시에만 임포트
+        from holidayskr import year_holidays
+
+        today = date.today()
+        until = today + timedelta(days=365 * options['years'])
+
+        calendar = {}
+        for year in range(today.year, until.year + 1):
+            for day, name in year_holidays(str(year)):
+                # 명절 연휴와 다른 공휴일이 겹치는 날은 먼저 나온 이름만 저장
+                if today <= day <= until:
+                    calendar.setdefault(day, name)
+
+        with transaction.atomic():
+            PublicHoliday.objects.filter(date__gte=today).delete()
+            PublicHoliday.objects.bulk_create(
+                PublicHoliday(date=day, name=name) for day, name in sorted(calendar.items())
+            )
+
+        # 워커들의 공휴일 달력 다시 로드
+        bump_version(holidays.DATASET_NAME)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"공휴일 {len(calendar)}개 저장 완료 ({today} ~ {until})")
+        )
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.18 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+# 마이그레이션 시점의 지오해시 인코딩 (icare.geo.encode_geohash와 같은 결과, 이후 변경과 무관하게 고정)
+GEOHASH_PRECISION = 5
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # 짝수 번째 비트는 경도
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if lon >= mid:
+                bits = bits * 2 + 1
+                lon_range[0] = mid
+            else:
+                bits = bits * 2
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = bits * 2 + 1
+                lat_range[0] = mid
+            else:
+                bits = bits * 2
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def fill_geohash(apps, schema_editor):
+    Hospital = apps.get_model("searchHospital", "Hospital")
+    rows = list(Hospital.objects.only("id", "latitude", "longitude"))
+    for row in rows:
+        row.geohash = encode_geohash(row.latitude, row.longitude)
+    Hospital.objects.bulk_update(rows, ["geohash"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("searchHospital", "0002_hospital"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hospital",
+            name="geohash",
+            field=models.CharField(blank=True, db_index=True, max_length=12),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
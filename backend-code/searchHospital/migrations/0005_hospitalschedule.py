@@ -0,0 +1,157 @@
+# Generated by Django 4.2.18 on 2026-10-18 11:00
+
+import re
+from datetime import datetime
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# 마이그레이션 시점의 요일별 진료 일정 해석 (searchHospital.schedule.schedule_rows와 같은 결과, 이후 변경과 무관하게 고정)
+WEEKDAY_KEYS = ["mon", "tue", "wed", "thu", "fri"]
+NOON = 12 * 60
+
+
+def normalize_time(time_str):
+    try:
+        time_str = re.sub(r"[가-힣]", "", time_str).strip()
+        if time_str.startswith("24:"):
+            return "00:00"
+        elif time_str.startswith("30:"):
+            return "18:00"
+        return time_str
+    except Exception:
+        return "00:00"
+
+
+def parse_minutes(time_str):
+    try:
+        parsed = datetime.strptime(normalize_time(time_str), "%H:%M")
+    except ValueError:
+        return None
+    return parsed.hour * 60 + parsed.minute
+
+
+def merge_hours(treatment_hours, reception_hours):
+    if not treatment_hours or all(v is None for v in treatment_hours.values()):
+        if reception_hours and "weekday" in reception_hours:
+            weekday_reception = reception_hours["weekday"]
+            if weekday_reception:
+                return {key: weekday_reception for key in WEEKDAY_KEYS}
+    return treatment_hours
+
+
+def day_hours(hospital, weekday):
+    lunch_time = hospital.lunch_time or {}
+    if weekday == 6:
+        if hospital.sunday_closed:
+            return None, None
+        return hospital.sunday_hours, None
+    if weekday == 5:
+        return (
+            hospital.saturday_hours or (hospital.reception_hours or {}).get("saturday"),
+            lunch_time.get("saturday"),
+        )
+    merged_weekday_hours = (
+        merge_hours(hospital.weekday_hours, hospital.reception_hours) or {}
+    )
+    return merged_weekday_hours.get(WEEKDAY_KEYS[weekday]), lunch_time.get("weekday")
+
+
+def lunch_minutes(lunch):
+    if not lunch:
+        return None
+    start = parse_minutes(lunch.get("start"))
+    end = parse_minutes(lunch.get("end"))
+    if start is None or end is None:
+        return None
+    if start < NOON:
+        if end >= NOON:
+            return None
+        start, end = start + NOON, end + NOON
+    return start, end
+
+
+def schedule_rows(hospital):
+    rows = []
+    for weekday in range(7):
+        hours, lunch = day_hours(hospital, weekday)
+        if not hours:
+            continue
+        open_min = parse_minutes(hours.get("start"))
+        close_min = parse_minutes(hours.get("end"))
+        if open_min is None or close_min is None:
+            continue
+        lunch_start_min, lunch_end_min = lunch_minutes(lunch) or (None, None)
+        rows.append(
+            {
+                "weekday": weekday,
+                "open_min": open_min,
+                "close_min": close_min,
+                "lunch_start_min": lunch_start_min,
+                "lunch_end_min": lunch_end_min,
+            }
+        )
+    return rows
+
+
+def fill_schedules(apps, schema_editor):
+    Hospital = apps.get_model("searchHospital", "Hospital")
+    HospitalSchedule = apps.get_model("searchHospital", "HospitalSchedule")
+    schedules = [
+        HospitalSchedule(hospital_id=hospital.id, **row)
+        for hospital in Hospital.objects.iterator(chunk_size=1000)
+        for row in schedule_rows(hospital)
+    ]
+    HospitalSchedule.objects.bulk_create(schedules, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("searchHospital", "0004_hospital_unit_x_hospital_unit_y_hospital_unit_z"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HospitalSchedule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("weekday", models.PositiveSmallIntegerField()),
+                ("open_min", models.SmallIntegerField()),
+                ("close_min", models.SmallIntegerField()),
+                ("lunch_start_min", models.SmallIntegerField(null=True)),
+                ("lunch_end_min", models.SmallIntegerField(null=True)),
+                (
+                    "hospital",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedules",
+                        to="searchHospital.hospital",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["weekday", "open_min", "close_min"],
+                        name="searchHospi_weekday_9563cb_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="hospitalschedule",
+            constraint=models.UniqueConstraint(
+                fields=("hospital", "weekday"), name="unique_hospital_schedule_weekday"
+            ),
+        ),
+        migrations.RunPython(fill_schedules, migrations.RunPython.noop),
+    ]
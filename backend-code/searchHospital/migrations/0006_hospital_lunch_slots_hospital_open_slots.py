@@ -0,0 +1,164 @@
+# Generated by Django 4.2.18 on 2026-10-18 11:03
+
+import re
+from datetime import datetime
+
+from django.db import migrations, models
+
+# 마이그레이션 시점의 요일별 진료 일정 해석 (searchHospital.schedule.schedule_rows와 같은 결과, 이후 변경과 무관하게 고정)
+WEEKDAY_KEYS = ["mon", "tue", "wed", "thu", "fri"]
+NOON = 12 * 60
+
+
+def normalize_time(time_str):
+    try:
+        time_str = re.sub(r"[가-힣]", "", time_str).strip()
+        if time_str.startswith("24:"):
+            return "00:00"
+        elif time_str.startswith("30:"):
+            return "18:00"
+        return time_str
+    except Exception:
+        return "00:00"
+
+
+def parse_minutes(time_str):
+    try:
+        parsed = datetime.strptime(normalize_time(time_str), "%H:%M")
+    except ValueError:
+        return None
+    return parsed.hour * 60 + parsed.minute
+
+
+def merge_hours(treatment_hours, reception_hours):
+    if not treatment_hours or all(v is None for v in treatment_hours.values()):
+        if reception_hours and "weekday" in reception_hours:
+            weekday_reception = reception_hours["weekday"]
+            if weekday_reception:
+                return {key: weekday_reception for key in WEEKDAY_KEYS}
+    return treatment_hours
+
+
+def day_hours(hospital, weekday):
+    lunch_time = hospital.lunch_time or {}
+    if weekday == 6:
+        if hospital.sunday_closed:
+            return None, None
+        return hospital.sunday_hours, None
+    if weekday == 5:
+        return (
+            hospital.saturday_hours or (hospital.reception_hours or {}).get("saturday"),
+            lunch_time.get("saturday"),
+        )
+    merged_weekday_hours = (
+        merge_hours(hospital.weekday_hours, hospital.reception_hours) or {}
+    )
+    return merged_weekday_hours.get(WEEKDAY_KEYS[weekday]), lunch_time.get("weekday")
+
+
+def lunch_minutes(lunch):
+    if not lunch:
+        return None
+    start = parse_minutes(lunch.get("start"))
+    end = parse_minutes(lunch.get("end"))
+    if start is None or end is None:
+        return None
+    if start < NOON:
+        if end >= NOON:
+            return None
+        start, end = start + NOON, end + NOON
+    return start, end
+
+
+def schedule_rows(hospital):
+    rows = []
+    for weekday in range(7):
+        hours, lunch = day_hours(hospital, weekday)
+        if not hours:
+            continue
+        open_min = parse_minutes(hours.get("start"))
+        close_min = parse_minutes(hours.get("end"))
+        if open_min is None or close_min is None:
+            continue
+        lunch_start_min, lunch_end_min = lunch_minutes(lunch) or (None, None)
+        rows.append(
+            {
+                "weekday": weekday,
+                "open_min": open_min,
+                "close_min": close_min,
+                "lunch_start_min": lunch_start_min,
+                "lunch_end_min": lunch_end_min,
+            }
+        )
+    return rows
+
+
+# 마이그레이션 시점의 주간 슬롯 비트맵 (icare.week_slots와 같은 형식: 10분 슬롯 7 x 144개, 슬롯 i는 바이트 i // 8의 i % 8번째 비트)
+SLOT_MINUTES = 10
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+BITMAP_BYTES = 7 * SLOTS_PER_DAY // 8
+
+
+def slots_within(weekday, start_min, end_min):
+    first = -(-start_min // SLOT_MINUTES)
+    last = min((end_min + 1) // SLOT_MINUTES - 1, SLOTS_PER_DAY - 1)
+    offset = weekday * SLOTS_PER_DAY
+    return range(offset + first, offset + last + 1)
+
+
+def slots_overlapping(weekday, start_min, end_min):
+    first = start_min // SLOT_MINUTES
+    last = min(end_min // SLOT_MINUTES, SLOTS_PER_DAY - 1)
+    offset = weekday * SLOTS_PER_DAY
+    return range(offset + first, offset + last + 1)
+
+
+def build_bitmap(slots):
+    bitmap = bytearray(BITMAP_BYTES)
+    for slot in slots:
+        bitmap[slot >> 3] |= 1 << (slot & 7)
+    return bytes(bitmap)
+
+
+def schedule_bitmaps(rows):
+    open_slots, lunch_slots = [], []
+    for row in rows:
+        open_slots.extend(
+            slots_within(row["weekday"], row["open_min"], row["close_min"])
+        )
+        if row["lunch_start_min"] is not None:
+            lunch_slots.extend(
+                slots_overlapping(
+                    row["weekday"], row["lunch_start_min"], row["lunch_end_min"]
+                )
+            )
+    return build_bitmap(open_slots), build_bitmap(lunch_slots)
+
+
+def fill_slot_bitmaps(apps, schema_editor):
+    Hospital = apps.get_model("searchHospital", "Hospital")
+    rows = list(Hospital.objects.all())
+    for row in rows:
+        row.open_slots, row.lunch_slots = schedule_bitmaps(schedule_rows(row))
+    Hospital.objects.bulk_update(rows, ["open_slots", "lunch_slots"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("searchHospital", "0005_hospitalschedule"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hospital",
+            name="lunch_slots",
+            field=models.BinaryField(default=b""),
+        ),
+        migrations.AddField(
+            model_name="hospital",
+            name="open_slots",
+            field=models.BinaryField(default=b""),
+        ),
+        migrations.RunPython(fill_slot_bitmaps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.18 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("searchHospital", "0006_hospital_lunch_slots_hospital_open_slots"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="hospitalschedule",
+            index=models.Index(
+                fields=["weekday", "close_min"], name="searchHospi_weekday_b13c95_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.18 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("searchHospital", "0007_hospitalschedule_searchhospi_weekday_b13c95_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PublicHoliday",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                ("name", models.CharField(max_length=50)),
+            ],
+        ),
+    ]
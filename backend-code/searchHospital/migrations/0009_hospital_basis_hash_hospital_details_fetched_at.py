@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("searchHospital", "0008_publicholiday"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hospital",
+            name="basis_hash",
+            field=models.CharField(blank=True, max_length=40),
+        ),
+        migrations.AddField(
+            model_name="hospital",
+            name="details_fetched_at",
+            field=models.DateTimeField(null=True),
+        ),
+    ]
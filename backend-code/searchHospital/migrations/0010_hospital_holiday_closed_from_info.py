@@ -0,0 +1,28 @@
+# Generated by Django 4.2.18 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+def fill_holiday_closed(apps, schema_editor):
+    # 이전에는 채우지 않고 기본값(True)으로만 남아 있던 값을 공휴일 세부 정보의 전부휴진 여부로 설정
+    Hospital = apps.get_model("searchHospital", "Hospital")
+    rows = list(Hospital.objects.only("id", "holiday_info"))
+    for row in rows:
+        row.holiday_closed = bool((row.holiday_info or {}).get("fully_closed"))
+    Hospital.objects.bulk_update(rows, ["holiday_closed"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("searchHospital", "0009_hospital_basis_hash_hospital_details_fetched_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="hospital",
+            name="holiday_closed",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(fill_holiday_closed, migrations.RunPython.noop),
+    ]
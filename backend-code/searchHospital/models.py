@@ -1,5 +1,9 @@
 from django.db import models
 
+from icare.geo import GeoQuerySet
+from icare.holidays import effective_weekday, is_holiday
+from icare.week_slots import SLOT_MINUTES, slot_start_minute
+
 
 class User(models.Model):
     email = models.EmailField(unique=True)
@@ -30,6 +34,36 @@ class PharmacyEnvelope(models.Model):
         return f"{self.pharmacy_name} - {self.prescription_number}"
 
 
+class HospitalQuerySet(GeoQuerySet):
+    def open_at(self, when, include_lunch=False):
+        """when 시각에 진료 중인 병원 (요일별 진료 일정 인덱스로 필터링, 공휴일은 일요일 일정이고 전부휴진 병원 제외)
+        슬롯 비트맵(icare.week_slots)과 같은 기준으로 when이 속한 10분 슬롯 전체가 진료시간 안에 있으면 진료 중,
+        슬롯이 점심시간과 조금이라도 겹치면 점심시간으로 판단한다."""
+        slot_start = slot_start_minute(when)
+        slot_last = slot_start + SLOT_MINUTES - 1
+        schedules = HospitalSchedule.objects.filter(
+            weekday=effective_weekday(when),
+            open_min__lte=slot_start,
+            close_min__gte=slot_last,
+        )
+        if not include_lunch:
+            schedules = schedules.exclude(lunch_start_min__lte=slot_last, lunch_end_min__gte=slot_start)
+        hospitals = self.filter(id__in=schedules.values('hospital_id'))
+        if is_holiday(when):
+            hospitals = hospitals.exclude(holiday_closed=True)
+        return hospitals
+
+    def scheduled_on(self, day):
+        """day에 진료 일정이 있는 병원 (그날의 open_min/close_min을 주석으로 추가, 이 값으로 정렬 가능, 공휴일은 일요일 일정이고 전부휴진 병원 제외)"""
+        hospitals = self.filter(schedules__weekday=effective_weekday(day)).annotate(
+            open_min=models.F('schedules__open_min'),
+            close_min=models.F('schedules__close_min'),
+        )
+        if is_holiday(day):
+            hospitals = hospitals.exclude(holiday_closed=True)
+        return hospitals
+
+
 class Hospital(models.Model):
     ykiho = models.CharField(max_length=100, unique=True)  # 병원 고유 ID
     name = models.CharField(max_length=200)  # 병원명
@@ -38,6 +72,11 @@ class Hospital(models.Model):
     department = models.CharField(max_length=1000)  # 진료과목
     latitude = models.FloatField()  # 위도
     longitude = models.FloatField()  # 경도
+    geohash = models.CharField(max_length=12, blank=True, db_index=True)  # 지오해시 셀
+    # 단위 구 위의 좌표 (거리 필터링을 내적으로 계산하기 위해 수집 시 저장)
+    unit_x = models.FloatField(default=0)
+    unit_y = models.FloatField(default=0)
+    unit_z = models.FloatField(default=0)
     
     # 진료시간 정보
     weekday_hours = models.JSONField(null=True)  # 평일 진료시간
@@ -50,7 +89,7 @@ class Hospital(models.Model):
     # 점심시간
     lunch_time = models.JSONField(null=True)
     
-    holiday_closed = models.BooleanField(default=True)  # 공휴일 휴무 여부
+    holiday_closed = models.BooleanField(default=False)  # 공휴일 전부휴진 여부 (holiday_info['fully_closed'])
     
     # 휴무일 정보 추가
     holiday_info = models.JSONField(null=True)  # 공휴일 세부 정보
@@ -58,9 +97,19 @@ class Hospital(models.Model):
     
     hospital_type = models.CharField(max_length=50, null=True)  # 원래 크기로 복구
     
+    # 주간 영업/점심시간 슬롯 비트맵 (10분 단위 7 x 144 슬롯, icare.week_slots 참고)
+    open_slots = models.BinaryField(default=b'')
+    lunch_slots = models.BinaryField(default=b'')
+    
+    # 증분 갱신용 (기본 정보가 바뀌었거나 상세 정보가 오래된 병원만 상세/진료과목을 다시 조회)
+    basis_hash = models.CharField(max_length=40, blank=True)  # 기본 정보(getHospBasisList) 지문
+    details_fetched_at = models.DateTimeField(null=True)  # 상세/진료과목 정보 마지막 조회 시각
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = HospitalQuerySet.as_manager()
+
     class Meta:
         indexes = [
             models.Index(fields=['latitude', 'longitude']),
@@ -69,3 +118,34 @@ class Hospital(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class HospitalSchedule(models.Model):
+    """병원의 요일별 진료 일정 (시간은 자정 기준 분, 수집 시 JSON 진료/접수/점심시간에서 생성)"""
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name="schedules")
+    weekday = models.PositiveSmallIntegerField()  # 0: 월요일 ~ 6: 일요일
+    open_min = models.SmallIntegerField()  # 진료 시작
+    close_min = models.SmallIntegerField()  # 진료 종료
+    lunch_start_min = models.SmallIntegerField(null=True)  # 점심시간 시작
+    lunch_end_min = models.SmallIntegerField(null=True)  # 점심시간 종료
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hospital', 'weekday'], name='unique_hospital_schedule_weekday'),
+        ]
+        indexes = [
+            models.Index(fields=['weekday', 'open_min', 'close_min']),
+            models.Index(fields=['weekday', 'close_min']),
+        ]
+
+    def __str__(self):
+        return f"{self.hospital_id} ({self.weekday})"
+
+
+class PublicHoliday(models.Model):
+    """공휴일 달력 (update_holidays 커맨드가 앞으로 2년치를 미리 채움, icare.holidays 참고)"""
+    date = models.DateField(unique=True)
+    name = models.CharField(max_length=50)
+
+    def __str__(self):
+        return f"{self.date} {self.name}"
@@ -0,0 +1,56 @@
+"""
+거리 기준 키셋(커서) 페이지네이션
+
+공간 인덱스가 돌려주는 (ID, 거리) 목록은 (거리, ID) 순으로 정렬되어 있으므로,
+마지막으로 보낸 항목의 (거리, ID)를 커서로 넘겨받아 그 다음 항목부터 잘라낸다.
+"""
+import base64
+import binascii
+from bisect import bisect_right
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(distance, pk):
+    raw = f"{distance!r}:{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """커서 문자열을 (거리, ID)로 변환"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        distance, pk = raw.split(':')
+        return float(distance), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor(cursor)
+
+
+def get_page_size(value):
+    """요청의 page_size 파라미터를 1 ~ MAX_PAGE_SIZE 범위로 보정"""
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def paginate_pairs(pairs, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """(ID, 거리) 목록에서 커서 다음 한 페이지와 다음 커서를 반환"""
+    start = 0
+    if cursor:
+        after_distance, after_pk = decode_cursor(cursor)
+        keys = [(distance, pk) for pk, distance in pairs]
+        start = bisect_right(keys, (after_distance, after_pk))
+
+    page = pairs[start:start + page_size]
+    next_cursor = None
+    if page and start + page_size < len(pairs):
+        last_pk, last_distance = page[-1]
+        next_cursor = encode_cursor(last_distance, last_pk)
+    return page, next_cursor
@@ -0,0 +1,184 @@
+"""
+병원 요일별 진료 일정
+
+수집 시 JSON 진료/접수/점심시간을 한 번만 해석해서 요일별 HospitalSchedule 행(자정 기준 분)으로 저장한다.
+평일 진료시간이 없으면 평일 접수시간으로, 토요일 진료시간이 없으면 토요일 접수시간으로 대신하고,
+"01:00~02:00"처럼 오전으로 저장된 점심시간은 오후로 보정한다.
+같은 일정으로 주간 영업/점심시간 슬롯 비트맵(icare.week_slots)도 만들어 Hospital에 저장하므로,
+요청 시 영업 상태는 비트 확인만으로, "특정 시각 영업 중인 병원"은 HospitalQuerySet.open_at의 SQL 조건(비트맵과 같은 슬롯 기준)으로 판단한다.
+"""
+import re
+from datetime import datetime
+
+from icare.holidays import effective_slot, is_holiday
+from icare.week_slots import build_bitmap, is_set, slots_overlapping, slots_within
+from .models import HospitalSchedule
+
+STATE_OPEN = "영업중"
+STATE_LUNCH = "점심시간"
+STATE_CLOSED = "영업종료"
+STATE_UNKNOWN = "확인요망"
+
+WEEKDAY_KEYS = ['mon', 'tue', 'wed', 'thu', 'fri']
+NOON = 12 * 60
+DAY_MINUTES = 24 * 60
+
+
+def normalize_time(time_str):
+    """시간 문자열을 정규화"""
+    try:
+        # 한글 제거
+        time_str = re.sub(r'[가-힣]', '', time_str)
+        # 공백 제거
+        time_str = time_str.strip()
+
+        # 30:00과 같은 잘못된 시간 처리
+        if time_str.startswith('24:'):
+            return '00:00'
+        elif time_str.startswith('30:'):
+            return '18:00'  # 또는 다른 적절한 기본값
+
+        return time_str
+    except Exception:
+        return '00:00'  # 파싱 실패시 기본값
+
+
+def parse_minutes(time_str):
+    """"HH:MM" 문자열을 자정 기준 분으로 변환 ("24:00"은 하루의 끝인 DAY_MINUTES, 형식이 잘못되면 None)"""
+    # normalize_time은 24시를 00:00으로 바꾸므로 종료 시각 24:00(자정까지 진료)은 먼저 처리
+    if isinstance(time_str, str) and time_str.strip() == '24:00':
+        return DAY_MINUTES
+    try:
+        parsed = datetime.strptime(normalize_time(time_str), '%H:%M')
+    except ValueError:
+        return None
+    return parsed.hour * 60 + parsed.minute
+
+
+def to_hhmm(minutes):
+    """자정 기준 분을 HHMM 정수로 변환 (예: 570 -> 930)"""
+    return minutes // 60 * 100 + minutes % 60
+
+
+def merge_hours(treatment_hours, reception_hours):
+    """진료시간과 접수시간 통합 (평일 진료시간이 없으면 평일 접수시간 사용)"""
+    if not treatment_hours or all(v is None for v in treatment_hours.values()):
+        if reception_hours and 'weekday' in reception_hours:
+            weekday_reception = reception_hours['weekday']
+            if weekday_reception:
+                return {key: weekday_reception for key in WEEKDAY_KEYS}
+    return treatment_hours
+
+
+def has_any_hours(hospital):
+    """진료/접수시간 정보가 하나라도 있는지 여부"""
+    return bool(
+        (hospital.weekday_hours and any(hospital.weekday_hours.values())) or
+        hospital.saturday_hours or
+        hospital.sunday_hours or
+        (hospital.reception_hours and any(hospital.reception_hours.values()))
+    )
+
+
+def day_hours(hospital, weekday):
+    """요일의 (진료시간, 점심시간) JSON 값"""
+    lunch_time = hospital.lunch_time or {}
+    if weekday == 6:
+        if hospital.sunday_closed:
+            return None, None
+        return hospital.sunday_hours, None
+    if weekday == 5:
+        return hospital.saturday_hours or (hospital.reception_hours or {}).get('saturday'), lunch_time.get('saturday')
+    merged_weekday_hours = merge_hours(hospital.weekday_hours, hospital.reception_hours) or {}
+    return merged_weekday_hours.get(WEEKDAY_KEYS[weekday]), lunch_time.get('weekday')
+
+
+def lunch_minutes(lunch):
+    """점심시간 JSON 값을 (시작, 종료) 분으로 변환 (오전으로 저장된 점심시간은 오후로 보정, 해석할 수 없으면 None)"""
+    if not lunch:
+        return None
+    start = parse_minutes(lunch.get('start'))
+    end = parse_minutes(lunch.get('end'))
+    if start is None or end is None:
+        return None
+    # 점심시간이 1시~2시로 저장된 경우 13:00~14:00으로 변환
+    if start < NOON:
+        if end >= NOON:
+            return None
+        start, end = start + NOON, end + NOON
+    return start, end
+
+
+def schedule_rows(hospital):
+    """병원의 JSON 시간 정보로 만든 요일별 일정 값 목록 (진료시간을 해석할 수 없는 요일은 제외)"""
+    rows = []
+    for weekday in range(7):
+        hours, lunch = day_hours(hospital, weekday)
+        if not hours:
+            continue
+        open_min = parse_minutes(hours.get('start'))
+        close_min = parse_minutes(hours.get('end'))
+        if open_min is None or close_min is None:
+            continue
+        lunch_start_min, lunch_end_min = lunch_minutes(lunch) or (None, None)
+        rows.append({
+            'weekday': weekday,
+            'open_min': open_min,
+            'close_min': close_min,
+            'lunch_start_min': lunch_start_min,
+            'lunch_end_min': lunch_end_min,
+        })
+    return rows
+
+
+def schedule_bitmaps(rows):
+    """요일별 일정 값 목록으로 (영업 슬롯 비트맵, 점심시간 슬롯 비트맵) 생성"""
+    open_slots, lunch_slots = [], []
+    for row in rows:
+        open_slots.extend(slots_within(row['weekday'], row['open_min'], row['close_min']))
+        if row['lunch_start_min'] is not None:
+            lunch_slots.extend(slots_overlapping(row['weekday'], row['lunch_start_min'], row['lunch_end_min']))
+    return build_bitmap(open_slots), build_bitmap(lunch_slots)
+
+
+def replace_schedules(rows_by_hospital, batch_size=1000):
+    """병원 ID별 요일별 일정 값 목록으로 여러 병원의 HospitalSchedule 행을 한 번에 교체"""
+    HospitalSchedule.objects.filter(hospital_id__in=list(rows_by_hospital)).delete()
+    HospitalSchedule.objects.bulk_create(
+        (
+            HospitalSchedule(hospital_id=hospital_id, **row)
+            for hospital_id, rows in rows_by_hospital.items()
+            for row in rows
+        ),
+        batch_size=batch_size,
+    )
+
+
+def save_schedules(hospital):
+    """병원의 요일별 진료 일정과 슬롯 비트맵을 JSON 시간 정보로 다시 생성"""
+    rows = schedule_rows(hospital)
+    replace_schedules({hospital.id: rows})
+    hospital.open_slots, hospital.lunch_slots = schedule_bitmaps(rows)
+    hospital.save(update_fields=['open_slots', 'lunch_slots'])
+
+
+def schedule_for(hospital, weekday):
+    """병원의 요일 일정 (없으면 None, schedules를 prefetch 해 두면 추가 쿼리 없음)"""
+    for schedule in hospital.schedules.all():
+        if schedule.weekday == weekday:
+            return schedule
+    return None
+
+
+def hospital_state(hospital, when):
+    """병원의 when 시각 영업 상태 (슬롯 비트맵 기준, 공휴일은 일요일 진료시간, 공휴일 전부휴진 병원은 영업종료)"""
+    if not has_any_hours(hospital):
+        return STATE_UNKNOWN
+    if hospital.holiday_closed and is_holiday(when):
+        return STATE_CLOSED
+    slot = effective_slot(when)
+    if is_set(hospital.lunch_slots, slot):
+        return STATE_LUNCH
+    if is_set(hospital.open_slots, slot):
+        return STATE_OPEN
+    return STATE_CLOSED
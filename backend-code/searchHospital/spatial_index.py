@@ -0,0 +1,207 @@
+"""
+병원 좌표 공간 인덱스
+
+워커 프로세스마다 전체 병원의 (위도, 경도)를 단위 구 위의 3차원 좌표로 변환해
+KD-tree를 한 번 만들어 두고, 반경/최근접 검색은 트리에서 병원 ID만 찾은 뒤
+ORM으로 해당 병원들만 조회한다. 구면 위 두 점 사이의 현(chord) 길이는
+대원 거리와 단조 관계이므로 KD-tree의 유클리드 거리 검색이 그대로 정확한 반경 검색이 된다.
+
+fetch_and_process_hospitals 커맨드가 끝나면 invalidate()가 병원 ID/좌표 배열을 스냅샷 파일로
+기록하고 데이터셋 버전을 올린다. 각 워커는 다음 요청에서 버전이 바뀐 것을 보고 스냅샷 파일을
+mmap 해서 인덱스를 다시 만든다 (좌표 배열은 모든 워커가 같은 페이지를 공유하고,
+KD-tree의 노드 정보만 워커별로 만들어진다). 스냅샷 파일이 없으면 DB에서 직접 읽는다.
+병원별 주간 영업/점심시간 슬롯 비트맵과 공휴일 전부휴진 여부도 함께 들고 있어 영업중인 병원 ID를 DB 조회 없이 계산할 수 있다.
+"""
+import math
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from icare import geo
+from icare.dataset_version import VersionedResource, bump_version
+from icare.geo import expanding_search
+from icare.snapshot_file import open_snapshot, snapshot_path, write_snapshot
+from icare.holidays import effective_slot, is_holiday
+from icare.week_slots import BITMAP_BYTES, bitmap_array, mask_at
+from .models import Hospital
+
+EARTH_RADIUS_KM = 6371
+DATASET_NAME = 'hospital'
+SNAPSHOT_COLUMNS = ['ids', 'points', 'open_slots', 'lunch_slots', 'holiday_closed']
+
+
+def to_unit_vectors(latitudes, longitudes):
+    """위도/경도(도) 배열을 단위 구 위의 (x, y, z) 좌표 배열로 변환"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def km_to_chord(distance_km):
+    """대원 거리(km)를 단위 구 위의 현 길이로 변환"""
+    angle = min(distance_km / EARTH_RADIUS_KM, math.pi)
+    return 2 * math.sin(angle / 2)
+
+
+def chord_to_km(chord):
+    """현 길이 배열을 대원 거리(km) 배열로 변환"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+class HospitalSpatialIndex:
+    """병원 ID와 좌표로 만든 KD-tree (영업/점심시간 슬롯 비트맵, 공휴일 전부휴진 여부 포함)"""
+
+    def __init__(self, ids, points, open_slots, lunch_slots, holiday_closed):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.open_slots = np.asarray(open_slots, dtype=np.uint8).reshape(-1, BITMAP_BYTES)
+        self.lunch_slots = np.asarray(lunch_slots, dtype=np.uint8).reshape(-1, BITMAP_BYTES)
+        self.holiday_closed = np.asarray(holiday_closed, dtype=bool)
+        # copy_data=False: mmap 된 좌표 배열을 복사하지 않고 그대로 사용
+        self.tree = cKDTree(self.points, copy_data=False) if len(self.ids) else None
+
+    @classmethod
+    def from_db(cls):
+        rows = list(Hospital.objects.values_list(
+            'id', 'latitude', 'longitude', 'open_slots', 'lunch_slots', 'holiday_closed'
+        ))
+        if not rows:
+            return cls([], [], [], [], [])
+        ids, latitudes, longitudes, open_slots, lunch_slots, holiday_closed = zip(*rows)
+        return cls(
+            ids, to_unit_vectors(latitudes, longitudes), bitmap_array(open_slots), bitmap_array(lunch_slots),
+            holiday_closed,
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        return cls(
+            snapshot['ids'], snapshot['points'], snapshot['open_slots'], snapshot['lunch_slots'],
+            snapshot['holiday_closed'],
+        )
+
+    @classmethod
+    def load(cls):
+        """스냅샷 파일이 있으면 mmap 해서, 없으면 DB에서 인덱스 생성"""
+        snapshot = open_snapshot(DATASET_NAME, SNAPSHOT_COLUMNS)
+        if snapshot is None:
+            return cls.from_db()
+        return cls.from_snapshot(snapshot)
+
+    def write_snapshot(self):
+        write_snapshot(
+            snapshot_path(DATASET_NAME),
+            {
+                'ids': self.ids,
+                'points': self.points,
+                'open_slots': self.open_slots,
+                'lunch_slots': self.lunch_slots,
+                'holiday_closed': self.holiday_closed,
+            },
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query_radius(self, lat, lon, radius_km):
+        """반경 내 병원을 거리순으로 반환: [(병원 ID, 거리 km), ...]"""
+        if self.tree is None:
+            return []
+        point = to_unit_vectors([lat], [lon])[0]
+        positions = self.tree.query_ball_point(point, km_to_chord(radius_km))
+        if not positions:
+            return []
+        positions = np.asarray(positions, dtype=np.int64)
+        chords = np.linalg.norm(self.tree.data[positions] - point, axis=1)
+        return self._sorted_pairs(positions, chord_to_km(chords))
+
+    def nearest(self, lat, lon, k, max_km=None):
+        """가까운 병원 최대 k개를 거리순으로 반환: [(병원 ID, 거리 km), ...]"""
+        if self.tree is None or k <= 0:
+            return []
+        point = to_unit_vectors([lat], [lon])[0]
+        upper_bound = km_to_chord(max_km) if max_km is not None else np.inf
+        chords, positions = self.tree.query(point, k=min(k, len(self.ids)), distance_upper_bound=upper_bound)
+        chords = np.atleast_1d(chords)
+        positions = np.atleast_1d(positions)
+        found = np.isfinite(chords)
+        return self._sorted_pairs(positions[found], chord_to_km(chords[found]))
+
+    def open_ids(self, when):
+        """when 시각에 영업 중인(점심시간 제외, 공휴일에는 전부휴진 병원 제외) 병원 ID"""
+        slot = effective_slot(when)
+        mask = mask_at(self.open_slots, slot) & ~mask_at(self.lunch_slots, slot)
+        if is_holiday(when):
+            mask &= ~self.holiday_closed
+        return self.ids[mask]
+
+    def _sorted_pairs(self, positions, distances):
+        ids = self.ids[positions]
+        order = np.lexsort((ids, distances))
+        return [(int(ids[i]), float(distances[i])) for i in order]
+
+
+_index = VersionedResource(DATASET_NAME, HospitalSpatialIndex.load)
+
+
+def get_index():
+    """현재 워커의 병원 인덱스 (데이터셋 버전이 바뀌었으면 다시 생성)"""
+    return _index.get()
+
+
+def open_hospital_ids(when):
+    """현재 워커의 병원 인덱스 기준 when 시각에 영업 중인 병원 ID (icare.open_now의 계산 함수)"""
+    return get_index().open_ids(when)
+
+
+def invalidate():
+    """DB의 병원 데이터로 스냅샷 파일을 새로 쓰고, 바뀌었음을 모든 워커에 알림"""
+    HospitalSpatialIndex.from_db().write_snapshot()
+    bump_version(DATASET_NAME)
+
+
+def attach_distances(pairs, queryset=None):
+    """(병원 ID, 거리) 목록을 거리순 Hospital 객체 목록으로 변환 (distance 속성 포함)"""
+    if queryset is None:
+        queryset = Hospital.objects.all()
+    return geo.attach_distances(queryset, pairs)
+
+
+def hospitals_within(lat, lon, radius_km, queryset=None):
+    """반경 내 병원을 거리순으로 조회"""
+    pairs = get_index().query_radius(lat, lon, radius_km)
+    return attach_distances(pairs, queryset)
+
+
+def ranked_hospitals_within(lat, lon, radius_km, queryset, limit):
+    """반경 내 병원 중 queryset의 정렬 순서로 앞에서부터 limit개 조회 (정렬/LIMIT은 DB에서 수행, distance 속성 포함)"""
+    distances = dict(get_index().query_radius(lat, lon, radius_km))
+    if not distances:
+        return []
+    hospitals = list(queryset.filter(id__in=distances.keys())[:limit])
+    for hospital in hospitals:
+        hospital.distance = distances[hospital.id]
+    return hospitals
+
+
+def nearest_hospitals(lat, lon, k, max_km=None, queryset=None):
+    """가까운 병원 최대 k개를 거리순으로 조회"""
+    pairs = get_index().nearest(lat, lon, k, max_km=max_km)
+    return attach_distances(pairs, queryset)
+
+
+def nearest_matching_hospitals(lat, lon, k, predicate=None, queryset=None, start_km=0.5, max_km=10):
+    """queryset 조건과 predicate(병원)을 만족하는 가장 가까운 병원 k개 (반경을 넓혀 가며 검색)"""
+    index = get_index()
+
+    def fetch_ring(inner_km, outer_km):
+        pairs = [
+            (pk, distance)
+            for pk, distance in index.query_radius(lat, lon, outer_km)
+            # 첫 고리(inner_km == 0)는 기준점과 같은 위치(거리 0)도 포함
+            if inner_km == 0 or distance > inner_km
+        ]
+        return attach_distances(pairs, queryset)
+
+    return expanding_search(fetch_ring, k, predicate=predicate, start_km=start_km, max_km=max_km)
@@ -1,3 +1,439 @@
-from django.test import TestCase
+import io
+import itertools
+import tempfile
+import threading
+from datetime import date, datetime
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from icare import holidays
+from icare.response_cache import cache_location_response
+from icare.dataset_version import bump_version
+from icare.pipeline import run_pipeline
+from icare.week_slots import is_set, slot_index
+from searchHospital import spatial_index, views
+from searchHospital.pagination import InvalidCursor, decode_cursor, encode_cursor, paginate_pairs
+from searchHospital.management.commands import fetch_and_process_hospitals
+from searchHospital.models import Hospital, HospitalSchedule, PublicHoliday
+from searchHospital.schedule import (
+    STATE_CLOSED, STATE_LUNCH, STATE_OPEN, hospital_state, lunch_minutes, merge_hours, parse_minutes, schedule_bitmaps,
+    schedule_rows,
+)
+
+DETAILS = {"trmtMonStart": "0900", "trmtMonEnd": "1800", "lunchWeek": "12:30~13:30"}
+
+
+def basis_record(ykiho, name, **overrides):
+    """병원 기본 목록 API 한 건과 같은 형식의 수집 데이터"""
+    return {
+        "ykiho": ykiho, "name": name, "address": "서울", "phone": "02-000-0000",
+        "latitude": 37.5, "longitude": 127.0,
+        "details": DETAILS, "departments": [{"name": "내과", "doctor_count": 1}],
+        "details_fetched": True,
+        **overrides,
+    }
+
+
+class HospitalUpsertTests(TestCase):
+    def setUp(self):
+        self.command = fetch_and_process_hospitals.Command(stdout=io.StringIO())
+
+    def entries(self, *hospitals):
+        return [self.command.build_hospital(hospital, "일반의원") for hospital in hospitals]
+
+    def test_save_chunk_updates_existing_rows(self):
+        self.command.save_chunk(self.entries(basis_record("A", "가병원")))
+        original = Hospital.objects.get(ykiho="A")
+
+        created, updated = self.command.save_chunk(
+            self.entries(basis_record("A", "가병원(이전)"), basis_record("B", "나병원"))
+        )
+        self.assertEqual((created, updated), (1, 1))
+        hospital = Hospital.objects.get(ykiho="A")
+        self.assertEqual((hospital.id, hospital.name), (original.id, "가병원(이전)"))
+        self.assertEqual(hospital.created_at, original.created_at)
+        self.assertEqual(HospitalSchedule.objects.filter(hospital=hospital).count(), 1)
+
+    def test_failed_detail_fetch_keeps_stored_schedule(self):
+        self.command.save_chunk(self.entries(basis_record("A", "가병원")))
+        original = Hospital.objects.get(ykiho="A")
+
+        failed = basis_record("A", "가병원(이전)", details={}, departments=[], details_fetched=False)
+        created, updated = self.command.save_chunk(self.entries(failed))
+        self.assertEqual((created, updated), (0, 1))
+        hospital = Hospital.objects.get(ykiho="A")
+        self.assertEqual(hospital.name, "가병원(이전)")
+        self.assertEqual(hospital.weekday_hours, original.weekday_hours)
+        self.assertEqual(hospital.department, original.department)
+        self.assertEqual(bytes(hospital.open_slots), bytes(original.open_slots))
+        # 지문과 조회 시각은 그대로 두어 다음 증분 갱신 때 다시 조회
+        self.assertEqual(hospital.basis_hash, original.basis_hash)
+        self.assertEqual(hospital.details_fetched_at, original.details_fetched_at)
+        self.assertEqual(HospitalSchedule.objects.filter(hospital=hospital).count(), 1)
+
+    def test_failed_ingest_raises_command_error(self):
+        with mock.patch.object(
+            fetch_and_process_hospitals.Command, 'iter_hospital_pages', side_effect=RuntimeError("API 오류")
+        ):
+            with self.assertRaises(CommandError):
+                call_command('fetch_and_process_hospitals', stdout=io.StringIO())
+
+    def test_upsert_omits_conflict_target_when_backend_lacks_it(self):
+        # MySQL처럼 충돌 대상을 지정할 수 없는 DB에서도 NotSupportedError 없이 저장
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            self.assertNotIn('unique_fields', fetch_and_process_hospitals.upsert_options())
+            created, updated = self.command.save_chunk(self.entries(basis_record("C", "다병원")))
+        self.assertEqual((created, updated), (1, 0))
+
+
+class NearestHospitalsTests(TestCase):
+    def setUp(self):
+        # 기준점(37.5, 127.0)에서 북쪽으로 약 0.1 / 1.1 / 5.6km
+        for ykiho, latitude in (("N1", 37.501), ("N2", 37.51), ("N3", 37.55)):
+            Hospital.objects.create(
+                ykiho=ykiho, name=ykiho, address="서울", phone="", department="",
+                latitude=latitude, longitude=127.0,
+            )
+        patcher = mock.patch.object(spatial_index, 'get_index', spatial_index.HospitalSpatialIndex.from_db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_returns_k_nearest_in_distance_order(self):
+        hospitals = spatial_index.nearest_hospitals(37.5, 127.0, 2)
+        self.assertEqual([h.ykiho for h in hospitals], ["N1", "N2"])
+        self.assertAlmostEqual(hospitals[0].distance, 0.111, places=2)
+
+    def test_limits_to_max_km(self):
+        hospitals = spatial_index.nearest_hospitals(37.5, 127.0, 5, max_km=2)
+        self.assertEqual([h.ykiho for h in hospitals], ["N1", "N2"])
+
+    def test_matching_search_includes_facility_at_query_point(self):
+        Hospital.objects.create(
+            ykiho="N0", name="N0", address="서울", phone="", department="", latitude=37.5, longitude=127.0,
+        )
+        hospitals = spatial_index.nearest_matching_hospitals(37.5, 127.0, 2)
+        self.assertEqual([h.ykiho for h in hospitals], ["N0", "N1"])
+        self.assertEqual(hospitals[0].distance, 0)
+
+
+@override_settings(INDEX_DIR=tempfile.mkdtemp())
+class EffectiveWeekdayTests(TestCase):
+    def setUp(self):
+        holidays.reset()
+        self.addCleanup(holidays.reset)
+        self.clock = 1000.0
+        patcher = mock.patch('icare.holidays.time.monotonic', lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_holiday_added_during_the_day_is_picked_up(self):
+        day = date(2026, 10, 19)  # 월요일
+        self.assertEqual(holidays.effective_weekday(day), 0)
+        PublicHoliday.objects.create(date=day, name="임시공휴일")
+        bump_version(holidays.DATASET_NAME)
+        self.clock += holidays.VERSION_CHECK_SECONDS
+        self.assertEqual(holidays.effective_weekday(day), holidays.SUNDAY)
+
+    def test_version_file_is_checked_once_per_interval(self):
+        day = date(2026, 10, 19)
+        with mock.patch('icare.holidays.get_version', return_value=0) as get_version:
+            for _ in range(100):
+                holidays.effective_weekday(day)
+            self.assertEqual(get_version.call_count, 1)
+            self.clock += holidays.VERSION_CHECK_SECONDS
+            holidays.effective_weekday(day)
+            self.assertEqual(get_version.call_count, 2)
+
+
+@override_settings(INDEX_DIR=tempfile.mkdtemp())
+class HolidayClosedTests(TestCase):
+    HOLIDAY = datetime(2026, 10, 19, 10, 0)  # 월요일 (임시공휴일)
+
+    def setUp(self):
+        command = fetch_and_process_hospitals.Command(stdout=io.StringIO())
+        # 두 병원 모두 일요일(공휴일) 09:00~13:00 진료, H2만 공휴일 전부휴진
+        details = {**DETAILS, "trmtSunStart": "0900", "trmtSunEnd": "1300"}
+        command.save_chunk([
+            command.build_hospital(basis_record("H1", "일요진료병원", details=details), "일반의원"),
+            command.build_hospital(
+                basis_record("H2", "공휴일휴진병원", details={**details, "noTrmtHoli": "공휴일 전부휴진"}), "일반의원"
+            ),
+        ])
+        PublicHoliday.objects.create(date=self.HOLIDAY.date(), name="임시공휴일")
+        holidays.reset()
+        self.addCleanup(holidays.reset)
+
+    def test_fully_closed_flag_is_stored(self):
+        self.assertEqual(
+            dict(Hospital.objects.values_list('ykiho', 'holiday_closed')), {"H1": False, "H2": True}
+        )
+
+    def test_fully_closed_hospital_is_closed_on_holidays_only(self):
+        hospital = Hospital.objects.get(ykiho="H2")
+        self.assertEqual(hospital_state(hospital, self.HOLIDAY), STATE_CLOSED)
+        self.assertEqual(hospital_state(hospital, datetime(2026, 10, 25, 10, 0)), STATE_OPEN)  # 일요일
+        self.assertEqual(hospital_state(Hospital.objects.get(ykiho="H1"), self.HOLIDAY), STATE_OPEN)
+
+    def test_open_filters_skip_fully_closed_hospitals_on_holidays(self):
+        h1 = Hospital.objects.get(ykiho="H1")
+        index = spatial_index.HospitalSpatialIndex.from_db()
+        self.assertEqual(list(index.open_ids(self.HOLIDAY)), [h1.id])
+        self.assertEqual(list(Hospital.objects.open_at(self.HOLIDAY)), [h1])
+        self.assertEqual(list(Hospital.objects.scheduled_on(self.HOLIDAY)), [h1])
+
+
+@override_settings(INDEX_DIR=tempfile.mkdtemp())
+class LocationResponseCacheTests(TestCase):
+    def test_holiday_update_invalidates_cached_responses(self):
+        calls = []
+
+        class OpenView:
+            @cache_location_response(spatial_index.DATASET_NAME)
+            def get(self, request):
+                calls.append(request)
+                return Response({"count": len(calls)})
+
+        cache.clear()
+        # 시간 구간 경계를 넘어 캐시가 바뀌지 않도록 구간 고정
+        patcher = mock.patch('icare.response_cache.time_bucket', return_value=(datetime(2026, 10, 19, 9, 0), 600))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        request = RequestFactory().get('/hospital/open/')
+        request.user = mock.Mock(profile=mock.Mock(latitude=37.5, longitude=127.0))
+        self.assertEqual(OpenView().get(request).data, {"count": 1})
+        self.assertEqual(OpenView().get(request).data, {"count": 1})
+        bump_version(holidays.DATASET_NAME)
+        self.assertEqual(OpenView().get(request).data, {"count": 2})
+
+
+class PaginatePairsTests(TestCase):
+    # (ID, 거리) 목록은 공간 인덱스처럼 (거리, ID) 순으로 정렬
+    PAIRS = [(3, 0.5), (1, 1.0), (2, 1.0), (5, 1.0), (4, 2.0)]
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(1.2345678901234567, 42)), (1.2345678901234567, 42))
+
+    def test_pages_cover_all_items_once_across_distance_ties(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = paginate_pairs(self.PAIRS, cursor=cursor, page_size=2)
+            seen.extend(pk for pk, _ in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [3, 1, 2, 5, 4])
+
+    def test_last_page_has_no_next_cursor(self):
+        page, cursor = paginate_pairs(self.PAIRS, page_size=5)
+        self.assertEqual(len(page), 5)
+        self.assertIsNone(cursor)
+
+    def test_invalid_cursor_raises(self):
+        for cursor in ("not-base64!", encode_cursor("x", 1), "MS4w"):  # "MS4w" = "1.0" (ID 없음)
+            with self.assertRaises(InvalidCursor):
+                paginate_pairs(self.PAIRS, cursor=cursor)
+
+
+@override_settings(INDEX_DIR=tempfile.mkdtemp())
+class NearbyHospitalPagingTests(TestCase):
+    def setUp(self):
+        # 같은 거리의 병원 두 곳 포함
+        for ykiho, latitude, longitude in (
+            ("P1", 37.501, 127.0), ("P2", 37.502, 127.0), ("P3", 37.502, 127.0),
+            ("P4", 37.503, 127.001), ("P5", 37.505, 127.0),
+        ):
+            Hospital.objects.create(
+                ykiho=ykiho, name=ykiho, address="서울", phone="", department="",
+                latitude=latitude, longitude=longitude,
+            )
+        cache.clear()
+        for patcher in (
+            mock.patch.object(views, 'get_index', spatial_index.HospitalSpatialIndex.from_db),
+            mock.patch('icare.response_cache.time_bucket', return_value=(datetime(2026, 10, 19, 9, 0), 600)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_page(self, latitude, longitude, cursor=None):
+        params = {'page_size': 2}
+        if cursor:
+            params['cursor'] = cursor
+        request = APIRequestFactory().get('/hospital/nearby/', params)
+        force_authenticate(request, user=mock.Mock(profile=mock.Mock(latitude=latitude, longitude=longitude)))
+        return views.NearbyHospitalAPIView.as_view()(request)
+
+    def test_users_in_one_cell_page_consistently(self):
+        # 같은 캐시 격자(37.500, 127.000) 안의 두 사용자가 번갈아 페이지를 넘김
+        user_a, user_b = (37.50001, 127.00001), (37.50004, 126.99996)
+        first = self.get_page(*user_a)
+        self.assertEqual(first.data, self.get_page(*user_b).data)
+
+        seen = [item['name'] for item in first.data['results']]
+        cursor = first.data['next_cursor']
+        users = [user_b, user_a]
+        while cursor:
+            response = self.get_page(*users[0], cursor=cursor)
+            seen.extend(item['name'] for item in response.data['results'])
+            cursor = response.data['next_cursor']
+            users.reverse()
+        self.assertEqual(seen, ["P1", "P2", "P3", "P4", "P5"])
+        self.assertEqual(first.data['count'], 5)
+
+    def test_invalid_cursor_returns_400(self):
+        self.assertEqual(self.get_page(37.5, 127.0, cursor="not-a-cursor").status_code, 400)
+
+
+@override_settings(INDEX_DIR=tempfile.mkdtemp())
+class OpenAtBoundaryTests(TestCase):
+    def setUp(self):
+        command = fetch_and_process_hospitals.Command(stdout=io.StringIO())
+        # 평일 09:05~18:00, 점심 12:30~13:30
+        details = {"trmtTueStart": "0905", "trmtTueEnd": "1800", "lunchWeek": "12시30분~13시30분"}
+        command.save_chunk([command.build_hospital(basis_record("B1", "경계병원", details=details), "일반의원")])
+        self.hospital = Hospital.objects.get(ykiho="B1")
+        holidays.reset()
+        self.addCleanup(holidays.reset)
+
+    def test_sql_prefilter_matches_slot_bitmaps(self):
+        index = spatial_index.HospitalSpatialIndex.from_db()
+        expected = {
+            (9, 0): STATE_CLOSED, (9, 5): STATE_CLOSED, (9, 10): STATE_OPEN,
+            (12, 25): STATE_OPEN, (12, 30): STATE_LUNCH, (13, 30): STATE_LUNCH, (13, 40): STATE_OPEN,
+            (17, 55): STATE_OPEN, (18, 0): STATE_CLOSED,
+        }
+        for (hour, minute), state in expected.items():
+            when = datetime(2026, 10, 20, hour, minute)  # 화요일
+            with self.subTest(when=when.time()):
+                self.assertEqual(hospital_state(self.hospital, when), state)
+                self.assertEqual(Hospital.objects.open_at(when).exists(), state == STATE_OPEN)
+                self.assertEqual(
+                    Hospital.objects.open_at(when, include_lunch=True).exists(), state in (STATE_OPEN, STATE_LUNCH)
+                )
+                self.assertEqual(self.hospital.id in index.open_ids(when), state == STATE_OPEN)
+
+
+class ScheduleRowsTests(TestCase):
+    def test_parse_minutes(self):
+        self.assertEqual(parse_minutes("09:30"), 570)
+        self.assertEqual(parse_minutes("24:00"), 24 * 60)
+        self.assertIsNone(parse_minutes("정보없음"))
+
+    def test_merge_hours_falls_back_to_weekday_reception(self):
+        reception = {'weekday': {'start': "08:30", 'end': "17:30"}, 'saturday': None}
+        merged = merge_hours({'mon': None, 'tue': None}, reception)
+        self.assertEqual(set(merged), {'mon', 'tue', 'wed', 'thu', 'fri'})
+        self.assertEqual(merged['fri'], reception['weekday'])
+        treatment = {'mon': {'start': "09:00", 'end': "18:00"}}
+        self.assertIs(merge_hours(treatment, reception), treatment)
+
+    def test_schedule_rows(self):
+        hospital = Hospital(
+            weekday_hours={'mon': {'start': "09:00", 'end': "24:00"}, 'tue': {'start': "09:00", 'end': "18:00"}},
+            saturday_hours=None,
+            sunday_hours={'start': "10:00", 'end': "14:00"},
+            reception_hours={'weekday': None, 'saturday': {'start': "09:00", 'end': "12:00"}},
+            # 오전으로 저장된 점심시간(01:00~02:00)은 오후로 보정
+            lunch_time={'weekday': {'start': "01:00", 'end': "02:00"}, 'saturday': None},
+            sunday_closed=True,
+        )
+        rows = {row['weekday']: row for row in schedule_rows(hospital)}
+        # 일요일 휴무면 일요일 진료시간이 있어도 일정 없음, 토요일은 접수시간으로 대신
+        self.assertEqual(sorted(rows), [0, 1, 5])
+        self.assertEqual((rows[0]['open_min'], rows[0]['close_min']), (540, 24 * 60))
+        self.assertEqual((rows[1]['lunch_start_min'], rows[1]['lunch_end_min']), (13 * 60, 14 * 60))
+        self.assertEqual((rows[5]['open_min'], rows[5]['close_min']), (540, 720))
+        self.assertIsNone(rows[5]['lunch_start_min'])
+
+        # 자정까지 진료하는 병원은 23:50 슬롯까지 영업
+        open_slots, _ = schedule_bitmaps(rows.values())
+        self.assertTrue(is_set(open_slots, slot_index(datetime(2026, 10, 19, 23, 55))))
+
+    def test_lunch_spanning_noon_is_dropped(self):
+        # 오전 시작/오후 종료처럼 보정할 수 없는 점심시간은 무시
+        self.assertIsNone(lunch_minutes({'start': "11:30", 'end': "13:00"}))
+        self.assertIsNone(lunch_minutes(None))
+        self.assertEqual(lunch_minutes({'start': "12:30", 'end': "13:30"}), (750, 810))
+
+
+def run_in_thread(func, timeout=5):
+    """func()를 별도 스레드에서 실행하고 (끝났는지 여부, 던진 예외) 반환"""
+    errors = []
+
+    def target():
+        try:
+            func()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive(), errors[0] if errors else None
+
+
+class PipelineTests(SimpleTestCase):
+    def test_items_pass_through_stages_in_order(self):
+        results = []
+        run_pipeline(range(20), [lambda x: x * 2, results.append])
+        self.assertEqual(results, [x * 2 for x in range(20)])
+
+    def test_queues_bound_items_in_flight(self):
+        produced = []
+        in_flight = []
+        release = threading.Event()
+
+        def source():
+            for i in range(20):
+                produced.append(i)
+                yield i
+
+        def blocked_stage(item):
+            release.wait()
+
+        def check_and_release():
+            in_flight.append(len(produced))
+            release.set()
+
+        threading.Timer(0.5, check_and_release).start()
+        run_pipeline(source(), [lambda x: x, blocked_stage], queue_size=1)
+        # 각 단계가 처리 중인 1개 + 단계 앞 큐 1개씩 + 넣으려고 기다리는 1개
+        self.assertLessEqual(in_flight[0], 2 * (1 + 1) + 1)
+        self.assertEqual(len(produced), 20)
+
+    def test_stage_error_stops_pipeline(self):
+        def failing_stage(item):
+            if item == 3:
+                raise ValueError("가공 실패")
+            return item
+
+        finished, error = run_in_thread(lambda: run_pipeline(itertools.count(), [failing_stage, lambda x: x]))
+        self.assertTrue(finished)
+        self.assertIsInstance(error, ValueError)
+
+    def test_source_error_stops_pipeline(self):
+        def failing_source():
+            yield 1
+            yield 2
+            raise ConnectionError("조회 실패")
+
+        finished, error = run_in_thread(lambda: run_pipeline(failing_source(), [lambda x: x, lambda x: x]))
+        self.assertTrue(finished)
+        self.assertIsInstance(error, ConnectionError)
+
+
+class PipelineCommandTests(TestCase):
+    def test_failed_fetch_stage_raises_command_error_without_hanging(self):
+        Command = fetch_and_process_hospitals.Command
+        with mock.patch.object(Command, 'iter_batches', return_value=itertools.repeat([basis_record("A", "가병원")])), \
+                mock.patch.object(Command, 'process_hospital_batch', side_effect=RuntimeError("상세 정보 조회 실패")):
+            finished, error = run_in_thread(
+                lambda: call_command('fetch_and_process_hospitals', stdout=io.StringIO())
+            )
+        self.assertTrue(finished)
+        self.assertIsInstance(error, CommandError)
+        self.assertIsInstance(error.__cause__, RuntimeError)
@@ -0,0 +1,73 @@
+"""
+약국 전체 목록 API 원본 응답 보관
+
+update_pharmacies --archive PATH는 받은 페이지의 원본 XML을 압축(zip, deflate) 파일에 page-00001.xml 순서로 저장하고,
+모든 페이지를 받은 뒤에만 보관 파일을 완성한다 (받는 도중 실패하면 남기지 않음).
+--replay PATH는 네트워크 없이 보관 파일의 페이지를 다시 파싱해서 같은 저장 과정을 실행하므로,
+파싱/변환/저장 단계만 따로 측정하거나 저장에 실패한 수집을 다시 내려받지 않고 재실행할 수 있다.
+"""
+import json
+import os
+import zipfile
+from datetime import datetime
+
+from .pharmacy_updater import FetchError, parse_page
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def page_name(page):
+    return f"page-{page:05d}.xml"
+
+
+class PageArchive:
+    """원본 XML 페이지를 임시 파일에 쓰고, 블록이 예외 없이 끝나면 path로 옮기는 보관 파일"""
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.pages = 0
+
+    def __enter__(self):
+        self._zip = zipfile.ZipFile(self.tmp_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        return self
+
+    def add(self, page, content):
+        """페이지 원본 XML 추가"""
+        self._zip.writestr(page_name(page), content)
+        self.pages += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            manifest = {'pages': self.pages, 'created_at': datetime.now().isoformat()}
+            self._zip.writestr(MANIFEST_NAME, json.dumps(manifest))
+        self._zip.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+        return False
+
+
+def iter_archived_pages(path):
+    """보관 파일의 페이지를 순서대로 PharmacyRecord 목록으로 반환 (불완전하거나 깨진 보관 파일이면 FetchError)"""
+    try:
+        archive = zipfile.ZipFile(path)
+    except (OSError, zipfile.BadZipFile) as e:
+        raise FetchError(f"보관 파일을 열 수 없습니다 ({path}): {str(e)}")
+
+    with archive:
+        names = sorted(name for name in archive.namelist() if name != MANIFEST_NAME)
+        try:
+            manifest = json.loads(archive.read(MANIFEST_NAME))
+        except KeyError:
+            raise FetchError(f"완성되지 않은 보관 파일입니다 ({path})")
+        if manifest['pages'] != len(names):
+            raise FetchError(f"보관 파일 페이지 수가 맞지 않습니다 ({len(names)}/{manifest['pages']})")
+
+        print(f"보관 파일에서 {len(names)}개 페이지를 읽습니다 ({manifest['created_at']} 수집)")
+        for name in names:
+            pharmacies = parse_page(archive.read(name))
+            if pharmacies is None:
+                raise FetchError(f"보관 파일의 {name} 페이지를 파싱할 수 없습니다")
+            yield pharmacies
@@ -1,64 +1,204 @@
+import time
+
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import DatabaseError, transaction
+from django.utils import timezone
 from searchPharmacy.models import Pharmacy
-from searchPharmacy.pharmacy_updater import fetch_all_pharmacies
+from searchPharmacy.archive import PageArchive, iter_archived_pages
+from searchPharmacy.pharmacy_updater import MAX_WORKERS, FetchError, PharmacyRecord, iter_pharmacy_pages
+from icare import http_client, table_swap
+from icare.geo import location_fields
+from searchPharmacy import snapshot
+
+BATCH_SIZE = 500  # 한 번에 생성/갱신/삭제할 행 수
+
+# 값이 바뀐 약국에서 다시 저장하는 필드 (기관 ID 제외)
+UPDATE_FIELDS = [
+    *(field for field in PharmacyRecord.__slots__ if field != 'hpid'),
+    'geohash', 'unit_x', 'unit_y', 'unit_z', 'open_slots', 'content_hash', 'last_updated',
+]
 
 class Command(BaseCommand):
-    help = '공공 API에서 약국 정보를 가져와 DB를 업데이트합니다'
+    help = '공공 API에서 약국 정보를 가져와 DB를 업데이트합니다 (기관 ID별로 바뀐 약국만 생성/갱신/삭제)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=MAX_WORKERS,
+            help=f'동시에 조회할 페이지 수 (기본값: {MAX_WORKERS})'
+        )
+        parser.add_argument(
+            '--swap',
+            action='store_true',
+            help='섀도 테이블에 전체 데이터를 채우고 검증한 뒤 운영 테이블과 교체 (MySQL)'
+        )
+        parser.add_argument(
+            '--rollback',
+            action='store_true',
+            help='직전 --swap 교체를 되돌림'
+        )
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument(
+            '--archive',
+            metavar='PATH',
+            help='받은 페이지의 원본 XML을 압축 파일로 보관한 뒤 그 파일에서 읽어 저장'
+        )
+        source.add_argument(
+            '--replay',
+            metavar='PATH',
+            help='네트워크 없이 --archive로 보관한 파일에서 읽어 저장'
+        )
+
+    def build_pharmacy(self, record, content_hash, pk=None, model=Pharmacy):
+        """수집한 약국 레코드로 약국 객체 생성 (pk를 주면 기존 행 갱신용, model은 섀도 테이블 모델)"""
+        pharmacy = model(
+            id=pk,
+            **record.as_fields(),
+            **location_fields(record.latitude, record.longitude),
+            content_hash=content_hash,
+            last_updated=timezone.now(),
+        )
+        # 주간 영업 슬롯 비트맵 (요청 시 영업 여부를 비트 하나로 확인)
+        pharmacy.open_slots = snapshot.pharmacy_open_slots(pharmacy)
+        return pharmacy
 
     def handle(self, *args, **options):
+        if options['rollback']:
+            self.rollback()
+            return
+        
         self.stdout.write('약국 정보 업데이트 시작...')
+        if options['archive']:
+            # 먼저 모든 페이지를 받아 보관한 뒤 보관 파일에서 읽어 저장 (저장에 실패해도 --replay로 바로 재실행)
+            try:
+                with PageArchive(options['archive']) as archive:
+                    for _ in iter_pharmacy_pages(workers=options['workers'], archive=archive):
+                        pass
+            except FetchError as e:
+                self.stdout.write(self.style.ERROR(f'데이터 가져오기 실패: {str(e)}'))
+                return
+            self.stdout.write(f"원본 응답 {archive.pages}개 페이지 보관 완료: {options['archive']}")
+            pages = iter_archived_pages(options['archive'])
+        elif options['replay']:
+            pages = iter_archived_pages(options['replay'])
+        else:
+            pages = iter_pharmacy_pages(workers=options['workers'])
         
-        pharmacies = fetch_all_pharmacies()
+        started = time.perf_counter()
+        if options['swap']:
+            self.swap(pages)
+        else:
+            self.upsert(pages)
+        self.stdout.write(f'저장 단계 소요 시간: {time.perf_counter() - started:.2f}초')
+        for line in http_client.summary():
+            self.stdout.write(line)
+
+    def swap(self, pages):
+        """페이지 단위 약국 레코드로 섀도 테이블을 새로 채우고 검증한 뒤 운영 테이블과 교체 (운영 테이블은 잠그지 않음)"""
+        try:
+            shadow = table_swap.create_shadow(Pharmacy)
+            # 같은 기관의 약국은 기존 ID 유지
+            existing = dict(Pharmacy.objects.filter(hpid__isnull=False).values_list('hpid', 'id'))
+            seen = set()
+            for records in pages:
+                pharmacies = []
+                for record in records:
+                    if not record.hpid or record.hpid in seen:
+                        continue
+                    seen.add(record.hpid)
+                    pharmacies.append(
+                        self.build_pharmacy(record, record.content_hash(), existing.get(record.hpid), shadow)
+                    )
+                shadow.objects.bulk_create(pharmacies, batch_size=BATCH_SIZE)
+            
+            count = table_swap.validate_shadow(Pharmacy, shadow)
+            table_swap.swap(Pharmacy)
+        except (FetchError, table_swap.SwapError, DatabaseError) as e:
+            # 반쯤 채운 섀도 테이블을 남기지 않음 (운영 테이블은 그대로)
+            table_swap.drop_shadow(Pharmacy)
+            self.stdout.write(self.style.ERROR(f'섀도 테이블 교체 중단: {str(e)}'))
+            return
         
-        if not pharmacies:
-            self.stdout.write(self.style.ERROR('데이터 가져오기 실패'))
+        # 스냅샷 파일을 새로 쓰고 워커들의 약국 스냅샷과 캐시된 검색 결과 무효화
+        snapshot.publish()
+        self.stdout.write(
+            self.style.SUCCESS(f'약국 {count}개로 테이블 교체 완료 (이전 테이블: {table_swap.previous_table(Pharmacy)})')
+        )
+
+    def rollback(self):
+        """직전 섀도 테이블 교체를 되돌림"""
+        try:
+            table_swap.rollback(Pharmacy)
+        except table_swap.SwapError as e:
+            self.stdout.write(self.style.ERROR(f'되돌리기 실패: {str(e)}'))
+            return
+        snapshot.publish()
+        self.stdout.write(self.style.SUCCESS('이전 약국 테이블로 되돌렸습니다'))
+
+    def collect_records(self, pages):
+        """페이지 단위 약국 레코드를 모두 받아 기관 ID별 레코드로 모음 (기관 ID가 없거나 중복된 레코드는 제외)"""
+        records = {}
+        for page in pages:
+            for record in page:
+                if record.hpid and record.hpid not in records:
+                    records[record.hpid] = record
+        return records
+
+    def apply_diff(self, records):
+        """기관 ID별 레코드와 비교해서 바뀐 약국만 운영 테이블에 생성/갱신/삭제 (생성, 갱신, 삭제, 변경 없음 수 반환)"""
+        # 기관 ID별 기존 행 ID와 내용 해시 (기관 ID가 없는 예전 행은 마지막에 삭제)
+        existing = {
+            hpid: (pk, content_hash)
+            for hpid, pk, content_hash in Pharmacy.objects.filter(hpid__isnull=False)
+            .values_list('hpid', 'id', 'content_hash')
+        }
+        new_pharmacies, changed_pharmacies = [], []
+        unchanged = 0
+        for hpid, record in records.items():
+            content_hash = record.content_hash()
+            pk, old_hash = existing.get(hpid, (None, None))
+            if pk is None:
+                new_pharmacies.append(self.build_pharmacy(record, content_hash))
+            elif old_hash != content_hash:
+                changed_pharmacies.append(self.build_pharmacy(record, content_hash, pk))
+            else:
+                unchanged += 1
+        
+        Pharmacy.objects.bulk_create(new_pharmacies, batch_size=BATCH_SIZE)
+        Pharmacy.objects.bulk_update(changed_pharmacies, UPDATE_FIELDS, batch_size=BATCH_SIZE)
+        
+        # 더 이상 API에 없는 약국 삭제
+        vanished = [pk for hpid, (pk, _) in existing.items() if hpid not in records]
+        for i in range(0, len(vanished), BATCH_SIZE):
+            Pharmacy.objects.filter(id__in=vanished[i:i + BATCH_SIZE]).delete()
+        deleted = len(vanished) + Pharmacy.objects.filter(hpid__isnull=True).delete()[0]
+        return len(new_pharmacies), len(changed_pharmacies), deleted, unchanged
+
+    def upsert(self, pages):
+        """페이지 단위 약국 레코드와 비교해서 기관 ID별로 바뀐 약국만 운영 테이블에 생성/갱신/삭제"""
+        try:
+            # 모든 페이지를 받은 뒤에 트랜잭션을 엶 (네트워크 조회 동안 트랜잭션을 열어 두지 않음, 조회에 실패하면 아무것도 저장하지 않음)
+            records = self.collect_records(pages)
+        except FetchError as e:
+            self.stdout.write(self.style.ERROR(f'데이터 가져오기 실패: {str(e)}'))
             return
         
         try:
             with transaction.atomic():
-                # 기존 데이터 삭제
-                Pharmacy.objects.all().delete()
-                
-                # 새 데이터 생성
-                pharmacy_objects = []
-                for data in pharmacies:
-                    pharmacy = Pharmacy(
-                        name=data['name'],
-                        address=data['addr'],
-                        tel=data['tel'],
-                        fax=data['fax'],
-                        latitude=data['lat'],
-                        longitude=data['lon'],
-                        map_info=data['map_info'],
-                        etc=data['etc'],
-                        
-                        # 운영시간
-                        mon_start=data['operating_hours']['월']['start'],
-                        mon_end=data['operating_hours']['월']['end'],
-                        tue_start=data['operating_hours']['화']['start'],
-                        tue_end=data['operating_hours']['화']['end'],
-                        wed_start=data['operating_hours']['수']['start'],
-                        wed_end=data['operating_hours']['수']['end'],
-                        thu_start=data['operating_hours']['목']['start'],
-                        thu_end=data['operating_hours']['목']['end'],
-                        fri_start=data['operating_hours']['금']['start'],
-                        fri_end=data['operating_hours']['금']['end'],
-                        sat_start=data['operating_hours']['토']['start'],
-                        sat_end=data['operating_hours']['토']['end'],
-                        sun_start=data['operating_hours']['일']['start'],
-                        sun_end=data['operating_hours']['일']['end'],
-                    )
-                    pharmacy_objects.append(pharmacy)
-                
-                # 벌크 생성
-                Pharmacy.objects.bulk_create(pharmacy_objects)
-                
-                self.stdout.write(
-                    self.style.SUCCESS(f'성공적으로 {len(pharmacy_objects)}개의 약국 정보를 업데이트했습니다')
-                )
-                
+                created, updated, deleted, unchanged = self.apply_diff(records)
+                # 바뀐 약국이 있으면 커밋 후 스냅샷 파일을 새로 쓰고 워커들의 약국 스냅샷과 캐시된 검색 결과 무효화
+                if created or updated or deleted:
+                    transaction.on_commit(snapshot.publish)
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'데이터 저장 중 오류 발생: {str(e)}')
-            ) 
\ No newline at end of file
+            )
+            return
+        
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'약국 정보 업데이트 완료 (추가 {created}개, 변경 {updated}개, '
+                f'삭제 {deleted}개, 변경 없음 {unchanged}개)'
+            )
+        )
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.18 on 2026-10-18 10:50
+
+import math
+
+from django.db import migrations, models
+
+
+# 마이그레이션 시점의 단위 벡터 변환 (icare.geo.unit_vector와 같은 결과, 이후 변경과 무관하게 고정)
+def unit_vector(lat, lon):
+    lat_rad = math.radians(lat)
+    lon_rad = math.radians(lon)
+    return (
+        math.cos(lat_rad) * math.cos(lon_rad),
+        math.cos(lat_rad) * math.sin(lon_rad),
+        math.sin(lat_rad),
+    )
+
+
+def fill_unit_vectors(apps, schema_editor):
+    Pharmacy = apps.get_model("searchPharmacy", "Pharmacy")
+    rows = list(Pharmacy.objects.only("id", "latitude", "longitude"))
+    for row in rows:
+        row.unit_x, row.unit_y, row.unit_z = unit_vector(row.latitude, row.longitude)
+    Pharmacy.objects.bulk_update(rows, ["unit_x", "unit_y", "unit_z"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("searchPharmacy", "0003_pharmacy_geohash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pharmacy",
+            name="unit_x",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="pharmacy",
+            name="unit_y",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name="pharmacy",
+            name="unit_z",
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(fill_unit_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.18 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+# 마이그레이션 시점의 주간 슬롯 비트맵 (icare.week_slots와 같은 형식: 10분 슬롯 7 x 144개, 슬롯 i는 바이트 i // 8의 i % 8번째 비트)
+SLOT_MINUTES = 10
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+BITMAP_BYTES = 7 * SLOTS_PER_DAY // 8
+
+
+def slots_within(weekday, start_min, end_min):
+    first = -(-start_min // SLOT_MINUTES)
+    last = min((end_min + 1) // SLOT_MINUTES - 1, SLOTS_PER_DAY - 1)
+    offset = weekday * SLOTS_PER_DAY
+    return range(offset + first, offset + last + 1)
+
+
+def build_bitmap(slots):
+    bitmap = bytearray(BITMAP_BYTES)
+    for slot in slots:
+        bitmap[slot >> 3] |= 1 << (slot & 7)
+    return bytes(bitmap)
+
+
+# 마이그레이션 시점의 약국 영업 슬롯 계산 (searchPharmacy.snapshot.pharmacy_open_slots와 같은 결과)
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def hhmm_to_minutes(value):
+    return int(value) // 100 * 60 + int(value) % 100
+
+
+def pharmacy_open_slots(pharmacy):
+    slots = []
+    for weekday, day in enumerate(DAYS):
+        start = getattr(pharmacy, f"{day}_start")
+        end = getattr(pharmacy, f"{day}_end")
+        if start and start.isdigit() and end and end.isdigit():
+            slots.extend(
+                slots_within(weekday, hhmm_to_minutes(start), hhmm_to_minutes(end))
+            )
+    return build_bitmap(slots)
+
+
+def fill_open_slots(apps, schema_editor):
+    Pharmacy = apps.get_model("searchPharmacy", "Pharmacy")
+    rows = list(Pharmacy.objects.all())
+    for row in rows:
+        row.open_slots = pharmacy_open_slots(row)
+    Pharmacy.objects.bulk_update(rows, ["open_slots"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("searchPharmacy", "0004_pharmacy_unit_x_pharmacy_unit_y_pharmacy_unit_z"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pharmacy",
+            name="open_slots",
+            field=models.BinaryField(default=b""),
+        ),
+        migrations.RunPython(fill_open_slots, migrations.RunPython.noop),
+    ]
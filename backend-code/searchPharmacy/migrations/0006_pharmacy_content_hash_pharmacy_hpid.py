@@ -0,0 +1,23 @@
+# Generated by Django 4.2.18 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("searchPharmacy", "0005_pharmacy_open_slots"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pharmacy",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=40),
+        ),
+        migrations.AddField(
+            model_name="pharmacy",
+            name="hpid",
+            field=models.CharField(max_length=20, null=True, unique=True),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 
+from icare.geo import GeoManager
+
 class User(models.Model):
     email = models.EmailField(unique=True)
     password_hash = models.CharField(max_length=255)
@@ -30,12 +32,18 @@ class PharmacyEnvelope(models.Model):
 
 
 class Pharmacy(models.Model):
+    hpid = models.CharField(max_length=20, unique=True, null=True)  # 공공 API 기관 ID (수집 시 변경분 비교 기준)
     name = models.CharField(max_length=100)
     address = models.CharField(max_length=200)
     tel = models.CharField(max_length=20)
     fax = models.CharField(max_length=20, blank=True)
     latitude = models.FloatField()
     longitude = models.FloatField()
+    geohash = models.CharField(max_length=12, blank=True, db_index=True)  # 지오해시 셀
+    # 단위 구 위의 좌표 (거리 필터링을 내적으로 계산하기 위해 수집 시 저장)
+    unit_x = models.FloatField(default=0)
+    unit_y = models.FloatField(default=0)
+    unit_z = models.FloatField(default=0)
     map_info = models.TextField(blank=True)
     etc = models.TextField(blank=True)
     
@@ -54,9 +62,15 @@ class Pharmacy(models.Model):
     sat_end = models.CharField(max_length=4, blank=True)
     sun_start = models.CharField(max_length=4, blank=True)
     sun_end = models.CharField(max_length=4, blank=True)
+    # 주간 영업 슬롯 비트맵 (10분 단위 7 x 144 슬롯, icare.week_slots 참고)
+    open_slots = models.BinaryField(default=b'')
+    # 수집한 API 필드 값의 해시 (값이 바뀐 약국만 다시 저장)
+    content_hash = models.CharField(max_length=40, blank=True)
     
     last_updated = models.DateTimeField(auto_now=True)
     
+    objects = GeoManager()
+    
     class Meta:
         indexes = [
             models.Index(fields=['latitude', 'longitude']),
@@ -1,15 +1,79 @@
+import hashlib
+import io
 import os
-import requests
+import time
 import xml.etree.ElementTree as ET
-from datetime import datetime
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from dotenv import load_dotenv
 
+from icare import http_client, rate_limit
+
 # 환경 변수 로드
 load_dotenv()
 
-def fetch_total_count():
+API_URL = "http://apis.data.go.kr/B552657/ErmctInsttInfoInqireService/getParmacyFullDown"
+NUM_OF_ROWS = 1000  # 한 번에 가져올 데이터 수
+MAX_WORKERS = 4  # 동시에 요청할 페이지 수 (호출 속도는 icare.rate_limit이 제한)
+REQUEST_TIMEOUT = (5, 60)  # (연결, 응답 읽기) 제한 시간 (초)
+
+DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+# (Pharmacy 필드, XML 태그, 기본값)
+TEXT_FIELDS = [
+    ('hpid', 'hpid', ''),
+    ('name', 'dutyName', '정보없음'),
+    ('address', 'dutyAddr', '정보없음'),
+    ('tel', 'dutyTel1', '정보없음'),
+    ('fax', 'dutyFax', '정보없음'),
+    ('map_info', 'dutyMapimg', ''),
+    ('etc', 'dutyEtc', ''),
+]
+HOUR_FIELDS = [(f'{day}_start', f'{day}_end') for day in DAYS]
+
+# 페이지별 조회 결과 (pharmacies는 실패 시 None, elapsed는 응답까지 걸린 시간, content는 keep_raw일 때 원본 XML)
+PageResult = namedtuple('PageResult', ['page', 'pharmacies', 'elapsed', 'content'], defaults=[None])
+
+
+class FetchError(Exception):
+    """전체 약국 수 조회 또는 페이지 조회 실패"""
+
+
+class PharmacyRecord:
+    """수집한 약국 한 건 (속성 이름은 Pharmacy 모델 필드와 같음)"""
+    __slots__ = [
+        *(field for field, _, _ in TEXT_FIELDS),
+        'latitude', 'longitude',
+        *(field for fields in HOUR_FIELDS for field in fields),
+    ]
+
+    def __init__(self, item):
+        for field, tag, default in TEXT_FIELDS:
+            setattr(self, field, item.findtext(tag, default))
+        self.latitude = float(item.findtext("wgs84Lat", "0"))
+        self.longitude = float(item.findtext("wgs84Lon", "0"))
+
+        # 운영시간 처리 (시작/종료 중 하나라도 없으면 둘 다 빈 값, dutyTime1~7 = 월~일)
+        for i, (start_field, end_field) in enumerate(HOUR_FIELDS, 1):
+            start = item.findtext(f"dutyTime{i}s", "")
+            end = item.findtext(f"dutyTime{i}c", "")
+            if not (start and end):
+                start = end = ""
+            setattr(self, start_field, start)
+            setattr(self, end_field, end)
+
+    def as_fields(self):
+        """Pharmacy(**fields)로 넘길 필드 값"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def content_hash(self):
+        """기관 ID를 제외한 필드 값의 해시 (값이 하나라도 바뀌면 달라짐)"""
+        values = '\x1f'.join(repr(getattr(self, field)) for field in self.__slots__ if field != 'hpid')
+        return hashlib.sha1(values.encode()).hexdigest()
+
+
+def fetch_total_count(url=API_URL, timeout=REQUEST_TIMEOUT):
     """전체 약국 수를 조회하는 함수"""
-    url = "http://apis.data.go.kr/B552657/ErmctInsttInfoInqireService/getParmacyFullDown"
     service_key = os.getenv("PHARMACY_API_KEY")
     
     params = {
@@ -20,7 +84,7 @@ def fetch_total_count():
     }
     
     try:
-        response = requests.get(url, params=params)
+        response = http_client.get('pharmacy', url, params=params, timeout=timeout)
         if response.status_code == 200:
             root = ET.fromstring(response.content)
             total_count = int(root.find(".//totalCount").text)
@@ -29,93 +93,141 @@ def fetch_total_count():
         print(f"전체 수 조회 중 오류 발생: {str(e)}")
         return None
 
-def fetch_pharmacies(page_no, num_of_rows=1000):
-    """특정 페이지의 약국 정보를 가져오는 함수"""
-    url = "http://apis.data.go.kr/B552657/ErmctInsttInfoInqireService/getParmacyFullDown"
-    service_key = os.getenv("PHARMACY_API_KEY")
-    
-    params = {
-        "serviceKey": service_key,
+def iter_pharmacies(source):
+    """약국 목록 XML을 읽는 대로 PharmacyRecord로 변환 (처리한 item 요소는 바로 버려 전체 트리를 만들지 않음)"""
+    items = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == 'items':
+                items = elem
+        elif elem.tag == 'item':
+            yield PharmacyRecord(elem)
+            if items is not None:
+                items.remove(elem)
+            else:
+                elem.clear()
+
+def page_params(page_no, num_of_rows):
+    """페이지 조회 요청 파라미터"""
+    return {
+        "serviceKey": os.getenv("PHARMACY_API_KEY"),
         "pageNo": page_no,
         "numOfRows": num_of_rows,
         "type": "xml"
     }
-    
+
+def parse_page(content):
+    """원본 XML 페이지를 PharmacyRecord 목록으로 변환 (XML이 깨져 있으면 None)"""
+    try:
+        return list(iter_pharmacies(io.BytesIO(content)))
+    except ET.ParseError as e:
+        print(f"XML 파싱 중 오류 발생: {str(e)}")
+        return None
+
+def fetch_pharmacies(page_no, num_of_rows=NUM_OF_ROWS, url=API_URL, timeout=REQUEST_TIMEOUT):
+    """특정 페이지의 약국 정보를 가져오는 함수 (응답을 받는 대로 파싱, 실패 시 None)"""
+    try:
+        with http_client.get(
+            'pharmacy', url, params=page_params(page_no, num_of_rows), timeout=timeout, stream=True
+        ) as response:
+            if response.status_code == 200:
+                response.raw.decode_content = True
+                return list(iter_pharmacies(response.raw))
+            print(f"{page_no} 페이지 응답 오류: HTTP {response.status_code}")
+    except Exception as e:
+        print(f"데이터 조회 중 오류 발생: {str(e)}")
+    return None
+
+def fetch_raw_page(page_no, num_of_rows=NUM_OF_ROWS, url=API_URL, timeout=REQUEST_TIMEOUT):
+    """특정 페이지의 원본 XML 응답 (실패 시 None)"""
     try:
-        response = requests.get(url, params=params)
+        response = http_client.get('pharmacy', url, params=page_params(page_no, num_of_rows), timeout=timeout)
         if response.status_code == 200:
-            root = ET.fromstring(response.content)
-            items = root.findall(".//item")
-            
-            pharmacies = []
-            for item in items:
-                pharmacy = {
-                    "name": item.findtext("dutyName", "정보없음"),
-                    "addr": item.findtext("dutyAddr", "정보없음"),
-                    "tel": item.findtext("dutyTel1", "정보없음"),
-                    "fax": item.findtext("dutyFax", "정보없음"),
-                    "lat": float(item.findtext("wgs84Lat", "0")),
-                    "lon": float(item.findtext("wgs84Lon", "0")),
-                    "map_info": item.findtext("dutyMapimg", ""),
-                    "etc": item.findtext("dutyEtc", ""),
-                }
-                
-                # 운영시간 처리
-                operating_hours = {}
-                days = ["월", "화", "수", "목", "금", "토", "일"]
-                for i, day in enumerate(days, 1):
-                    start = item.findtext(f"dutyTime{i}s", "")
-                    end = item.findtext(f"dutyTime{i}c", "")
-                    if start and end:
-                        operating_hours[day] = {
-                            "start": start,
-                            "end": end,
-                            "formatted": f"{start[:2]}:{start[2:]} - {end[:2]}:{end[2:]}"
-                        }
-                    else:
-                        operating_hours[day] = {
-                            "start": "",
-                            "end": "",
-                            "formatted": "정보없음"
-                        }
-                
-                pharmacy["operating_hours"] = operating_hours
-                pharmacies.append(pharmacy)
-                
-            return pharmacies
+            return response.content
+        print(f"{page_no} 페이지 응답 오류: HTTP {response.status_code}")
     except Exception as e:
         print(f"데이터 조회 중 오류 발생: {str(e)}")
-        return None
+    return None
 
-def fetch_all_pharmacies():
-    """전체 약국 정보를 수집하는 메인 함수"""
+def fetch_page(page_no, num_of_rows=NUM_OF_ROWS, url=API_URL, timeout=REQUEST_TIMEOUT, keep_raw=False):
+    """한 페이지를 조회하고 걸린 시간과 함께 반환 (keep_raw면 원본 XML도 함께 반환)"""
+    started = time.perf_counter()
+    content = None
+    if keep_raw:
+        content = fetch_raw_page(page_no, num_of_rows, url, timeout)
+        pharmacies = parse_page(content) if content is not None else None
+    else:
+        pharmacies = fetch_pharmacies(page_no, num_of_rows, url, timeout)
+    return PageResult(page_no, pharmacies, time.perf_counter() - started, content)
+
+def iter_pages(pages, num_of_rows=NUM_OF_ROWS, workers=MAX_WORKERS, url=API_URL, timeout=REQUEST_TIMEOUT,
+               keep_raw=False):
+    """여러 페이지를 최대 workers개씩 동시에 조회해서 페이지 순서대로 반환 (받아 둔 페이지도 최대 workers개)"""
+    pages = iter(pages)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque(
+            executor.submit(fetch_page, page, num_of_rows, url, timeout, keep_raw) for page in islice(pages, workers)
+        )
+        while pending:
+            result = pending.popleft().result()
+            page = next(pages, None)
+            if page is not None:
+                pending.append(executor.submit(fetch_page, page, num_of_rows, url, timeout, keep_raw))
+            if result.pharmacies is None:
+                print(f"- {result.page} 페이지 데이터 조회 실패 ({result.elapsed:.2f}초)")
+            else:
+                print(f"- {result.page} 페이지 {len(result.pharmacies)}개 ({result.elapsed:.2f}초)")
+            yield result
+
+def fetch_pages(pages, num_of_rows=NUM_OF_ROWS, workers=MAX_WORKERS, url=API_URL, timeout=REQUEST_TIMEOUT):
+    """여러 페이지를 동시에 조회한 결과 목록 (페이지 순서대로)"""
+    return list(iter_pages(pages, num_of_rows, workers, url, timeout))
+
+def iter_pharmacy_pages(workers=MAX_WORKERS, num_of_rows=NUM_OF_ROWS, url=API_URL, timeout=REQUEST_TIMEOUT,
+                        archive=None):
+    """전체 약국 정보를 페이지 단위 PharmacyRecord 목록으로 차례대로 반환 (archive에 원본 XML 보관, 조회에 실패하면 FetchError)"""
     print("전체 약국 수 조회 중...")
-    total_count = fetch_total_count()
+    total_count = fetch_total_count(url, timeout)
     
     if not total_count:
-        print("전체 약국 수 조회 실패")
-        return None
+        raise FetchError("전체 약국 수 조회 실패")
     
     print(f"총 {total_count}개의 약국이 있습니다.")
     
     # 페이지 계산
-    num_of_rows = 1000  # 한 번에 가져올 데이터 수
     total_pages = (total_count + num_of_rows - 1) // num_of_rows
+    # 도중에 한도에 걸려 일부 페이지만 받는 일이 없도록 시작 전에 남은 호출 수 확인
+    try:
+        rate_limit.check_quota('pharmacy', total_pages)
+    except rate_limit.QuotaExceeded as e:
+        raise FetchError(str(e))
+    print(f"{total_pages}개 페이지를 최대 {workers}개씩 동시에 조회합니다.")
     
-    all_pharmacies = []
-    
-    for page in range(1, total_pages + 1):
-        print(f"\n{page}/{total_pages} 페이지 처리 중... ({len(all_pharmacies)}/{total_count})")
-        
-        pharmacies = fetch_pharmacies(page, num_of_rows)
-        if pharmacies:
-            all_pharmacies.extend(pharmacies)
-            print(f"- {len(pharmacies)}개 데이터 추가됨")
-        else:
-            print(f"- {page} 페이지 데이터 조회 실패")
+    started = time.perf_counter()
+    fetched = 0
+    pages = range(1, total_pages + 1)
+    for result in iter_pages(pages, num_of_rows, workers, url, timeout, keep_raw=archive is not None):
+        # 일부 페이지만 받은 상태로 전체 약국 데이터를 덮어쓰지 않도록 실패한 페이지가 있으면 중단
+        if result.pharmacies is None:
+            raise FetchError(f"{result.page} 페이지 조회 실패")
+        if archive is not None:
+            archive.add(result.page, result.content)
+        fetched += len(result.pharmacies)
+        yield result.pharmacies
     
-    print(f"\n전체 {len(all_pharmacies)}개의 약국 정보 수집 완료!")
-    return all_pharmacies
+    print(f"\n전체 {fetched}개의 약국 정보 수집 완료! ({time.perf_counter() - started:.2f}초)")
+
+def fetch_all_pharmacies(workers=MAX_WORKERS, num_of_rows=NUM_OF_ROWS, url=API_URL, timeout=REQUEST_TIMEOUT):
+    """전체 약국 정보를 수집하는 메인 함수 (페이지 순서 유지, 실패한 페이지가 있으면 None)"""
+    try:
+        return [
+            pharmacy
+            for pharmacies in iter_pharmacy_pages(workers, num_of_rows, url, timeout)
+            for pharmacy in pharmacies
+        ]
+    except FetchError as e:
+        print(str(e))
+        return None
 
 if __name__ == "__main__":
     pharmacies = fetch_all_pharmacies()
@@ -125,10 +237,12 @@ if __name__ == "__main__":
         print("\n처음 5개 약국 정보:")
         for pharmacy in pharmacies[:5]:
             print("\n" + "="*50)
-            print(f"약국명: {pharmacy['name']}")
-            print(f"주소: {pharmacy['addr']}")
-            print(f"전화: {pharmacy['tel']}")
-            print(f"위치: 위도 {pharmacy['lat']}, 경도 {pharmacy['lon']}")
+            print(f"약국명: {pharmacy.name}")
+            print(f"주소: {pharmacy.address}")
+            print(f"전화: {pharmacy.tel}")
+            print(f"위치: 위도 {pharmacy.latitude}, 경도 {pharmacy.longitude}")
             print("\n운영시간:")
-            for day, hours in pharmacy['operating_hours'].items():
-                print(f"  {day}: {hours['formatted']}") 
\ No newline at end of file
+            for day, (start_field, end_field) in zip("월화수목금토일", HOUR_FIELDS):
+                start, end = getattr(pharmacy, start_field), getattr(pharmacy, end_field)
+                hours = f"{start[:2]}:{start[2:]} - {end[:2]}:{end[2:]}" if start else "정보없음"
+                print(f"  {day}: {hours}") 
\ No newline at end of file
@@ -5,6 +5,11 @@ from datetime import datetime
 import logging
 import sys
 
+from icare import open_now
+from icare.week_slots import SLOT_MINUTES
+from searchHospital import spatial_index
+from searchPharmacy import snapshot
+
 logger = logging.getLogger('searchPharmacy')
 
 def start():
@@ -27,6 +32,39 @@ def start():
             replace_existing=True
         )
         
+        # 매일 새벽 2시에 바뀐 병원만 증분 갱신 (새 병원, 기본 정보가 바뀐 병원, 상세 정보가 오래된 병원)
+        scheduler.add_job(
+            refresh_hospital_data,
+            'cron',
+            hour=2,
+            minute=0,
+            name='hospital_refresh',
+            jobstore='default',
+            replace_existing=True
+        )
+        
+        # 매월 1일 새벽 4시에 앞으로 2년치 공휴일 달력 갱신
+        scheduler.add_job(
+            update_holiday_calendar,
+            'cron',
+            day=1,
+            hour=4,
+            minute=0,
+            name='holiday_update',
+            jobstore='default',
+            replace_existing=True
+        )
+        
+        # 10분(영업 슬롯 경계)마다 "지금 영업중인 병원/약국" 집합 갱신
+        scheduler.add_job(
+            refresh_open_now,
+            'cron',
+            minute=f'*/{SLOT_MINUTES}',
+            name='open_now_refresh',
+            jobstore='default',
+            replace_existing=True
+        )
+        
         try:
             logger.info("Starting scheduler...")
             scheduler.start()
@@ -39,4 +77,26 @@ def update_pharmacy_data():
         call_command('update_pharmacies')
         logger.info(f"약국 데이터 업데이트 완료: {datetime.now()}")
     except Exception as e:
-        logger.error(f"약국 데이터 업데이트 실패: {str(e)}") 
\ No newline at end of file
+        logger.error(f"약국 데이터 업데이트 실패: {str(e)}")
+
+def refresh_hospital_data():
+    try:
+        logger.info(f"병원 데이터 증분 갱신 시작: {datetime.now()}")
+        call_command('fetch_and_process_hospitals', incremental=True)
+        logger.info(f"병원 데이터 증분 갱신 완료: {datetime.now()}")
+    except Exception as e:
+        logger.error(f"병원 데이터 증분 갱신 실패: {str(e)}")
+
+def update_holiday_calendar():
+    try:
+        call_command('update_holidays')
+    except Exception as e:
+        logger.error(f"공휴일 달력 업데이트 실패: {str(e)}")
+
+def refresh_open_now():
+    try:
+        now = datetime.now()
+        open_now.refresh(spatial_index.DATASET_NAME, spatial_index.open_hospital_ids, now)
+        open_now.refresh(snapshot.DATASET_NAME, snapshot.open_pharmacy_ids, now)
+    except Exception as e:
+        logger.error(f"영업중 시설 집합 갱신 실패: {str(e)}")
@@ -2,6 +2,8 @@ from rest_framework import serializers
 from .models import Pharmacy
 from datetime import datetime
 
+from icare.holidays import effective_weekday
+
 class PharmacySerializer(serializers.ModelSerializer):
     distance = serializers.FloatField()
     operating_hours = serializers.SerializerMethodField()
@@ -24,7 +26,7 @@ class PharmacySerializer(serializers.ModelSerializer):
 
     def get_current_status(self, obj):
         now = datetime.now()
-        weekday = now.weekday()
+        weekday = effective_weekday(now)
         current_time = now.strftime('%H%M')
 
         time_mapping = {
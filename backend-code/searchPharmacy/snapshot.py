@@ -0,0 +1,213 @@
+"""
+약국 컬럼형 스냅샷
+
+전국 약국의 좌표와 요일별 영업 시작/종료 시간(14개 컬럼)을 워커마다 NumPy 배열로 들고 있다가,
+거리(haversine)와 "특정 시각 영업 여부"를 전체 약국에 대해 한 번의 벡터 연산으로 계산한다.
+영업 시간은 DB에 "HHMM" 문자열로 저장되어 있으므로 적재할 때 정수(HHMM)로 바꾸고,
+값이 없거나 숫자가 아니면 -1로 둔다. 영업 여부는 수집 시 만든 주간 영업 슬롯 비트맵(icare.week_slots)의
+비트 하나로 판단한다. 응답에 필요한 약국명/주소/전화번호는 문자열 컬럼으로 함께 둔다.
+
+update_pharmacies 커맨드가 끝나면 publish()가 스냅샷 파일을 새로 쓰고 데이터셋 버전을 올린다.
+각 워커는 다음 요청에서 새 파일을 읽기 전용으로 mmap 하므로 배열은 모든 워커가 같은 페이지를 공유한다.
+스냅샷 파일이 없으면 DB에서 직접 읽는다.
+"""
+import numpy as np
+
+from icare import geo
+from icare.dataset_version import VersionedResource, bump_version
+from icare.open_now import contains
+from icare.snapshot_file import StringColumn, open_snapshot, snapshot_path, write_snapshot
+from icare.holidays import effective_slot
+from icare.week_slots import BITMAP_BYTES, bitmap_array, build_bitmap, mask_at, slots_within
+from .models import Pharmacy
+
+DATASET_NAME = 'pharmacy'
+
+DAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+START_FIELDS = [f'{day}_start' for day in DAYS]
+END_FIELDS = [f'{day}_end' for day in DAYS]
+STRING_FIELDS = ['name', 'address', 'tel']
+SNAPSHOT_COLUMNS = ['ids', 'latitudes', 'longitudes', 'starts', 'ends', 'open_slots']
+
+MISSING_TIME = -1
+
+
+def parse_hhmm(value):
+    """"HHMM" 문자열을 정수로 변환 (없거나 잘못된 값은 MISSING_TIME)"""
+    if value and value.isdigit():
+        return int(value)
+    return MISSING_TIME
+
+
+def hhmm_to_minutes(value):
+    """정수 HHMM을 자정 기준 분으로 변환"""
+    return value // 100 * 60 + value % 100
+
+
+def pharmacy_open_slots(pharmacy):
+    """약국의 요일별 영업 시작/종료 시간으로 주간 영업 슬롯 비트맵 생성"""
+    slots = []
+    for weekday, (start_field, end_field) in enumerate(zip(START_FIELDS, END_FIELDS)):
+        start = parse_hhmm(getattr(pharmacy, start_field))
+        end = parse_hhmm(getattr(pharmacy, end_field))
+        if start != MISSING_TIME and end != MISSING_TIME:
+            slots.extend(slots_within(weekday, hhmm_to_minutes(start), hhmm_to_minutes(end)))
+    return build_bitmap(slots)
+
+
+def format_hhmm(value):
+    """정수 HHMM을 DB와 같은 "HHMM" 문자열로 변환 (MISSING_TIME은 빈 문자열)"""
+    return '' if value == MISSING_TIME else f'{value:04d}'
+
+
+class SnapshotPharmacy:
+    """스냅샷에서 꺼낸 약국 한 건 (format_pharmacy_data에 필요한 속성을 Pharmacy 모델과 같은 이름으로 가짐)"""
+
+    __slots__ = ['id', 'distance', 'open_slots', *STRING_FIELDS, *START_FIELDS, *END_FIELDS]
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+
+class PharmacySnapshot:
+    """약국 ID/좌표/영업시간/영업 슬롯 비트맵 배열과 문자열 컬럼"""
+
+    def __init__(self, ids, latitudes, longitudes, starts, ends, open_slots, strings):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        # (약국 수, 7) 크기, 열은 월~일 (datetime.weekday() 순서)
+        self.starts = np.asarray(starts, dtype=np.int16).reshape(-1, 7)
+        self.ends = np.asarray(ends, dtype=np.int16).reshape(-1, 7)
+        self.open_slots = np.asarray(open_slots, dtype=np.uint8).reshape(-1, BITMAP_BYTES)
+        self.strings = strings
+
+    @classmethod
+    def from_db(cls):
+        rows = Pharmacy.objects.values_list(
+            'id', 'latitude', 'longitude', *START_FIELDS, *END_FIELDS, *STRING_FIELDS, 'open_slots'
+        )
+        ids, latitudes, longitudes, starts, ends, open_slots = [], [], [], [], [], []
+        strings = {name: [] for name in STRING_FIELDS}
+        for row in rows.iterator(chunk_size=5000):
+            ids.append(row[0])
+            latitudes.append(row[1])
+            longitudes.append(row[2])
+            starts.append([parse_hhmm(value) for value in row[3:10]])
+            ends.append([parse_hhmm(value) for value in row[10:17]])
+            for name, value in zip(STRING_FIELDS, row[17:20]):
+                strings[name].append(value)
+            open_slots.append(row[20])
+
+        return cls(
+            ids, latitudes, longitudes, starts, ends, bitmap_array(open_slots),
+            {name: StringColumn.from_list(values) for name, values in strings.items()},
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        return cls(
+            snapshot['ids'], snapshot['latitudes'], snapshot['longitudes'],
+            snapshot['starts'], snapshot['ends'], snapshot['open_slots'], snapshot.strings,
+        )
+
+    @classmethod
+    def load(cls):
+        """스냅샷 파일이 있으면 mmap 해서, 없으면 DB에서 생성"""
+        snapshot = open_snapshot(DATASET_NAME, SNAPSHOT_COLUMNS)
+        if snapshot is None:
+            return cls.from_db()
+        return cls.from_snapshot(snapshot)
+
+    def write_snapshot(self):
+        write_snapshot(
+            snapshot_path(DATASET_NAME),
+            {
+                'ids': self.ids,
+                'latitudes': self.latitudes,
+                'longitudes': self.longitudes,
+                'starts': self.starts,
+                'ends': self.ends,
+                'open_slots': self.open_slots,
+            },
+            self.strings,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def distances_km(self, lat, lon):
+        """모든 약국까지의 거리(km)"""
+        lat1 = np.radians(lat)
+        lat2 = np.radians(self.latitudes)
+        d_lat = lat2 - lat1
+        d_lon = np.radians(self.longitudes - lon)
+        a = np.sin(d_lat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(d_lon / 2) ** 2
+        return 2 * geo.EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+    def open_mask(self, when):
+        """when 시각에 영업 중인 약국 여부 (영업 슬롯 비트맵 기준, format_pharmacy_data와 같은 기준)"""
+        return mask_at(self.open_slots, effective_slot(when))
+
+    def within(self, lat, lon, radius_km, mask=None):
+        """반경 내 (mask를 만족하는) 약국을 거리순으로 반환: [(약국 ID, 거리 km), ...]"""
+        return [(int(self.ids[i]), distance) for i, distance in self._positions_within(lat, lon, radius_km, mask)]
+
+    def open_within(self, lat, lon, radius_km, when):
+        """반경 내에서 when 시각에 영업 중인 약국을 거리순으로 반환"""
+        return self.within(lat, lon, radius_km, mask=self.open_mask(when))
+
+    def open_ids(self, when):
+        """when 시각에 영업 중인 약국 ID"""
+        return self.ids[self.open_mask(when)]
+
+    def pharmacies_within(self, lat, lon, radius_km, mask=None, limit=None, among=None):
+        """반경 내 (mask를 만족하고 정렬된 ID 배열 among에 있는) 약국을 거리순 SnapshotPharmacy 목록으로 반환 (DB 조회 없음)"""
+        positions = self._positions_within(lat, lon, radius_km, mask, among)[:limit]
+        return [self._pharmacy_at(i, distance) for i, distance in positions]
+
+    def _positions_within(self, lat, lon, radius_km, mask=None, among=None):
+        if not len(self.ids):
+            return []
+        distances = self.distances_km(lat, lon)
+        selected = distances <= radius_km
+        if mask is not None:
+            selected &= mask
+        positions = np.flatnonzero(selected)
+        if among is not None:
+            positions = positions[contains(among, self.ids[positions])]
+        order = np.lexsort((self.ids[positions], distances[positions]))
+        return [(int(i), float(distances[i])) for i in positions[order]]
+
+    def _pharmacy_at(self, i, distance):
+        fields = {name: self.strings[name][i] for name in STRING_FIELDS}
+        fields.update(zip(START_FIELDS, (format_hhmm(int(value)) for value in self.starts[i])))
+        fields.update(zip(END_FIELDS, (format_hhmm(int(value)) for value in self.ends[i])))
+        return SnapshotPharmacy(id=int(self.ids[i]), distance=distance, open_slots=self.open_slots[i].tobytes(), **fields)
+
+
+_snapshot = VersionedResource(DATASET_NAME, PharmacySnapshot.load)
+
+
+def get_snapshot():
+    """현재 워커의 약국 스냅샷 (데이터셋 버전이 바뀌었으면 다시 생성)"""
+    return _snapshot.get()
+
+
+def open_pharmacy_ids(when):
+    """현재 워커의 약국 스냅샷 기준 when 시각에 영업 중인 약국 ID (icare.open_now의 계산 함수)"""
+    return get_snapshot().open_ids(when)
+
+
+def publish():
+    """DB의 약국 데이터로 스냅샷 파일을 새로 쓰고, 바뀌었음을 모든 워커에 알림"""
+    PharmacySnapshot.from_db().write_snapshot()
+    bump_version(DATASET_NAME)
+
+
+def attach_distances(pairs, queryset=None):
+    """(약국 ID, 거리) 목록을 거리순 Pharmacy 객체 목록으로 변환 (distance 속성 포함)"""
+    if queryset is None:
+        queryset = Pharmacy.objects.all()
+    return geo.attach_distances(queryset, pairs)
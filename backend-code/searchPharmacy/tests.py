@@ -1,3 +1,242 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from icare import http_client
+from searchPharmacy import pharmacy_updater
+from searchPharmacy.archive import PageArchive, iter_archived_pages
+from searchPharmacy.management.commands import update_pharmacies
+from searchPharmacy.models import Pharmacy
+
+TOTAL_COUNT = 10
+
+
+def pharmacy_page_xml(page_no, num_of_rows):
+    """공공 API와 같은 형식의 약국 목록 XML (약국 이름은 전체 순번)"""
+    first = (page_no - 1) * num_of_rows
+    items = ''.join(
+        f"<item><hpid>C{index:07d}</hpid><dutyName>약국{index}</dutyName><dutyAddr>주소{index}</dutyAddr>"
+        f"<wgs84Lat>37.5</wgs84Lat><wgs84Lon>127.0</wgs84Lon>"
+        f"<dutyTime1s>0900</dutyTime1s><dutyTime1c>1800</dutyTime1c></item>"
+        for index in range(first, min(first + num_of_rows, TOTAL_COUNT))
+    )
+    return (
+        f"<response><body><items>{items}</items>"
+        f"<totalCount>{TOTAL_COUNT}</totalCount></body></response>"
+    ).encode()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """약국 전체 목록 API 대역 (페이지별 지연 시간과 실패 페이지는 서버 속성으로 지정, 처리 구간은 handled에 기록)"""
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        page_no = int(params['pageNo'][0])
+        num_of_rows = int(params['numOfRows'][0])
+        server = self.server
+        started = time.perf_counter()
+        if num_of_rows > 1:
+            time.sleep(server.delays.get(page_no, 0))
+        server.handled.append((started, time.perf_counter()))
+        if server.flaky_pages.get(page_no):
+            server.flaky_pages[page_no] -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        if page_no in server.failing_pages:
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = pharmacy_page_xml(page_no, num_of_rows)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PharmacyFetchTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/getParmacyFullDown"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.delays = {}
+        self.server.failing_pages = set()
+        self.server.flaky_pages = {}
+        self.server.handled = []
+
+    def max_concurrent_requests(self):
+        """대역 서버가 동시에 처리한 요청 수의 최댓값"""
+        events = sorted(
+            [(started, 1) for started, _ in self.server.handled] +
+            [(finished, -1) for _, finished in self.server.handled]
+        )
+        active = peak = 0
+        for _, change in events:
+            active += change
+            peak = max(peak, active)
+        return peak
+
+    def test_fetch_all_preserves_page_order(self):
+        # 앞 페이지일수록 늦게 응답해도 결과는 페이지 순서대로
+        self.server.delays = {1: 0.3, 2: 0.2, 3: 0.1}
+        pharmacies = pharmacy_updater.fetch_all_pharmacies(workers=4, num_of_rows=3, url=self.url)
+        self.assertEqual([p.name for p in pharmacies], [f"약국{i}" for i in range(TOTAL_COUNT)])
+        self.assertEqual((pharmacies[0].mon_start, pharmacies[0].mon_end), ('0900', '1800'))
+
+    def test_pages_are_fetched_concurrently_up_to_limit(self):
+        self.server.delays = {page: 0.2 for page in range(1, 5)}
+        started = time.perf_counter()
+        results = pharmacy_updater.fetch_pages(range(1, 5), num_of_rows=3, workers=2, url=self.url)
+        elapsed = time.perf_counter() - started
+        self.assertEqual([r.page for r in results], [1, 2, 3, 4])
+        self.assertEqual(self.max_concurrent_requests(), 2)
+        self.assertLess(elapsed, 0.7)
+
+    def test_reports_per_page_latency(self):
+        self.server.delays = {1: 0.2}
+        results = pharmacy_updater.fetch_pages([1, 2], num_of_rows=3, workers=2, url=self.url)
+        self.assertGreaterEqual(results[0].elapsed, 0.2)
+        self.assertLess(results[1].elapsed, 0.2)
+
+    def test_slow_page_times_out(self):
+        self.server.delays = {2: 1.0}
+        results = pharmacy_updater.fetch_pages([1, 2], num_of_rows=3, workers=2, url=self.url, timeout=0.2)
+        self.assertEqual(len(results[0].pharmacies), 3)
+        self.assertIsNone(results[1].pharmacies)
+        self.assertLess(results[1].elapsed, 1.0)
+
+    def test_transient_server_error_is_retried(self):
+        self.server.flaky_pages = {2: 1}
+        before = http_client.stats().get('pharmacy', {}).get('retries', 0)
+        results = pharmacy_updater.fetch_pages([1, 2], num_of_rows=3, workers=2, url=self.url)
+        self.assertEqual([len(r.pharmacies) for r in results], [3, 3])
+        self.assertEqual(len(self.server.handled), 3)
+        self.assertEqual(http_client.stats()['pharmacy']['retries'], before + 1)
+
+    def test_failed_page_aborts_full_download(self):
+        self.server.failing_pages = {2}
+        self.assertIsNone(pharmacy_updater.fetch_all_pharmacies(workers=4, num_of_rows=3, url=self.url))
+
+    def test_failed_page_raises_while_streaming_pages(self):
+        self.server.failing_pages = {3}
+        pages = pharmacy_updater.iter_pharmacy_pages(workers=2, num_of_rows=3, url=self.url)
+        self.assertEqual(len(next(pages)), 3)
+        self.assertEqual(len(next(pages)), 3)
+        with self.assertRaises(pharmacy_updater.FetchError):
+            next(pages)
+
+
+class PharmacyRecordTests(SimpleTestCase):
+    def test_iter_pharmacies_builds_compact_records(self):
+        xml = (
+            "<response><body><items>"
+            "<item><dutyName>가약국</dutyName><wgs84Lat>37.1</wgs84Lat><wgs84Lon>127.2</wgs84Lon>"
+            "<dutyTime6s>1000</dutyTime6s><dutyTime7s>1000</dutyTime7s><dutyTime7c>1400</dutyTime7c></item>"
+            "<item><dutyName>나약국</dutyName></item>"
+            "</items></body></response>"
+        ).encode()
+        records = list(pharmacy_updater.iter_pharmacies(io.BytesIO(xml)))
+        self.assertEqual([r.name for r in records], ['가약국', '나약국'])
+        first = records[0]
+        self.assertEqual((first.latitude, first.longitude), (37.1, 127.2))
+        self.assertEqual(first.address, '정보없음')
+        # 시작/종료 중 하나만 있으면 둘 다 빈 값
+        self.assertEqual((first.sat_start, first.sat_end), ('', ''))
+        self.assertEqual((first.sun_start, first.sun_end), ('1000', '1400'))
+        self.assertFalse(hasattr(first, '__dict__'))
+        self.assertEqual(first.as_fields()['sun_end'], '1400')
+
+
+class PageArchiveTests(SimpleTestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'pharmacies.zip')
+
+    def test_replay_returns_archived_pages_in_order(self):
+        with PageArchive(self.path) as archive:
+            for page in (1, 2, 3, 4):
+                archive.add(page, pharmacy_page_xml(page, 3))
+        pages = list(iter_archived_pages(self.path))
+        self.assertEqual([len(records) for records in pages], [3, 3, 3, 1])
+        self.assertEqual([r.name for records in pages for r in records], [f"약국{i}" for i in range(TOTAL_COUNT)])
+
+    def test_failed_download_leaves_no_archive(self):
+        with self.assertRaises(pharmacy_updater.FetchError):
+            with PageArchive(self.path) as archive:
+                archive.add(1, pharmacy_page_xml(1, 3))
+                raise pharmacy_updater.FetchError("2 페이지 조회 실패")
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+        with self.assertRaises(pharmacy_updater.FetchError):
+            list(iter_archived_pages(self.path))
+
+
+def pharmacy_records(*pharmacies):
+    """(기관 ID, 약국 이름) 목록으로 만든 약국 레코드"""
+    items = ''.join(
+        f"<item><hpid>{hpid}</hpid><dutyName>{name}</dutyName>"
+        f"<wgs84Lat>37.5</wgs84Lat><wgs84Lon>127.0</wgs84Lon></item>"
+        for hpid, name in pharmacies
+    )
+    xml = f"<response><body><items>{items}</items></body></response>".encode()
+    return list(pharmacy_updater.iter_pharmacies(io.BytesIO(xml)))
+
+
+class PharmacyUpsertTests(TransactionTestCase):
+    def setUp(self):
+        self.command = update_pharmacies.Command(stdout=io.StringIO())
+        for record in pharmacy_records(("A", "가약국"), ("B", "나약국"), ("D", "라약국"), ("L", "예전약국")):
+            self.command.build_pharmacy(record, record.content_hash()).save()
+        # 기관 ID 없이 저장된 예전 행
+        Pharmacy.objects.filter(hpid="L").update(hpid=None)
+        self.original = dict(Pharmacy.objects.filter(hpid__isnull=False).values_list('hpid', 'id'))
+
+    def pages(self):
+        # 페이지를 받는 동안에는 트랜잭션이 열려 있지 않아야 함
+        for page in (pharmacy_records(("A", "가약국"), ("B", "나약국(이전)")), pharmacy_records(("C", "다약국"), ("A", "중복"))):
+            self.assertFalse(connection.in_atomic_block)
+            yield page
+
+    def test_diff_inserts_updates_and_deletes_by_hpid(self):
+        with mock.patch.object(update_pharmacies.snapshot, 'publish') as publish:
+            self.command.upsert(self.pages())
+        self.assertIn("추가 1개, 변경 1개, 삭제 2개, 변경 없음 1개", self.command.stdout.getvalue())
+        self.assertEqual(
+            dict(Pharmacy.objects.values_list('hpid', 'name')), {"A": "가약국", "B": "나약국(이전)", "C": "다약국"}
+        )
+        # 기존 약국은 ID 유지
+        self.assertEqual(Pharmacy.objects.get(hpid="B").id, self.original["B"])
+        publish.assert_called_once()
+
+    def test_failed_fetch_writes_nothing(self):
+        def failing_pages():
+            yield pharmacy_records(("C", "다약국"))
+            raise pharmacy_updater.FetchError("2 페이지 조회 실패")
+
+        self.command.upsert(failing_pages())
+        self.assertIn("데이터 가져오기 실패", self.command.stdout.getvalue())
+        self.assertFalse(Pharmacy.objects.filter(hpid="C").exists())
+        self.assertEqual(Pharmacy.objects.count(), 4)
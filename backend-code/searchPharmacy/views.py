@@ -2,10 +2,13 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import F
-from django.db.models.functions import Radians, Sin, Cos, ACos
 from .models import Pharmacy
 from .serializers import PharmacySerializer
+from .snapshot import DATASET_NAME, get_snapshot, open_pharmacy_ids
+from icare import open_now
+from icare.response_cache import cache_location_response, request_location
+from icare.holidays import effective_slot, effective_weekday
+from icare.week_slots import is_set
 from users.models import UserProfile
 from django.core.management import call_command
 import requests
@@ -26,8 +29,8 @@ def haversine(lat1, lon1, lat2, lon2):
 
 def format_pharmacy_data(pharmacy):
     """약국 정보를 원하는 형식으로 변환"""
-    weekday = datetime.now().weekday()
-    current_time = datetime.now().strftime('%H%M')
+    now = datetime.now()
+    weekday = effective_weekday(now)
 
     # 요일별 시작/종료 시간
     time_mapping = {
@@ -42,14 +45,8 @@ def format_pharmacy_data(pharmacy):
 
     start_time, end_time = time_mapping[weekday]
     
-    # 영업 상태 확인
-    if start_time and end_time:  # 영업 시간 정보가 있는 경우만 체크
-        if start_time <= current_time <= end_time:
-            status = "영업중"
-        else:
-            status = "영업종료"
-    else:  # 영업 시간 정보가 없으면 영업종료
-        status = "영업종료"
+    # 영업 상태 확인 (수집 시 만든 주간 영업 슬롯 비트맵에서 현재 슬롯의 비트만 확인)
+    status = "영업중" if is_set(pharmacy.open_slots, effective_slot(now)) else "영업종료"
 
     # 영업 시간 포맷팅
     operating_hours = "정보없음"
@@ -73,39 +70,24 @@ class OpenPharmacyListAPIView(APIView):
     """영업중인 약국 목록을 반환하는 API"""
     permission_classes = [IsAuthenticated]
 
+    @cache_location_response(DATASET_NAME, params=())
     def get(self, request, *args, **kwargs):
         try:
-            user_profile = request.user.profile
-            if not (user_profile.latitude and user_profile.longitude):
+            # 응답 캐시 격자점 기준 위치
+            location = request_location(request)
+            if location is None:
                 return Response(
                     {"error": "사용자의 위치 정보가 없습니다."}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            ref_lat = float(user_profile.latitude)
-            ref_lon = float(user_profile.longitude)
-
-            nearby_pharmacies = (
-                Pharmacy.objects
-                .annotate(
-                    distance=ACos(
-                        Cos(Radians(ref_lat)) * 
-                        Cos(Radians(F('latitude'))) * 
-                        Cos(Radians(F('longitude')) - Radians(ref_lon)) + 
-                        Sin(Radians(ref_lat)) * 
-                        Sin(Radians(F('latitude')))
-                    ) * 6371
-                )
-                .filter(distance__lte=10)  # 10km 이내
-                .order_by('distance')
-            )
+            ref_lat, ref_lon = location
+
+            # 10km 이내 약국을 스케줄러가 캐시해 둔 "지금 영업중인 약국" 집합과 교차 (스냅샷 사용, DB 조회 없음)
+            open_ids = open_now.get_open_ids(DATASET_NAME, open_pharmacy_ids)
+            open_pharmacies = get_snapshot().pharmacies_within(ref_lat, ref_lon, 10, among=open_ids)
 
-            # 영업중인 약국만 필터링
-            formatted_pharmacies = []
-            for pharmacy in nearby_pharmacies:
-                formatted_data = format_pharmacy_data(pharmacy)
-                if formatted_data["영업 상태"] == "영업중":
-                    formatted_pharmacies.append(formatted_data)
+            formatted_pharmacies = [format_pharmacy_data(p) for p in open_pharmacies]
 
             return Response(formatted_pharmacies)
 
@@ -119,32 +101,21 @@ class NearbyPharmacyListAPIView(APIView):
     """가까운 순서대로 약국 목록을 반환하는 API"""
     permission_classes = [IsAuthenticated]
 
+    @cache_location_response(DATASET_NAME, params=())
     def get(self, request, *args, **kwargs):
         try:
-            user_profile = request.user.profile
-            if not (user_profile.latitude and user_profile.longitude):
+            # 응답 캐시 격자점 기준 위치
+            location = request_location(request)
+            if location is None:
                 return Response(
                     {"error": "사용자의 위치 정보가 없습니다."}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            ref_lat = float(user_profile.latitude)
-            ref_lon = float(user_profile.longitude)
-
-            nearby_pharmacies = (
-                Pharmacy.objects
-                .annotate(
-                    distance=ACos(
-                        Cos(Radians(ref_lat)) * 
-                        Cos(Radians(F('latitude'))) * 
-                        Cos(Radians(F('longitude')) - Radians(ref_lon)) + 
-                        Sin(Radians(ref_lat)) * 
-                        Sin(Radians(F('latitude')))
-                    ) * 6371
-                )
-                .filter(distance__lte=10)  # 10km 이내
-                .order_by('distance')[:5]  # 가까운 5개만
-            )
+            ref_lat, ref_lon = location
+
+            # 가까운 5개만 (가까운 반경부터 넓혀 가며 최대 10km까지 검색)
+            nearby_pharmacies = Pharmacy.objects.nearest(ref_lat, ref_lon, 5, max_km=10)
 
             formatted_pharmacies = [format_pharmacy_data(p) for p in nearby_pharmacies]
             return Response(formatted_pharmacies)